@@ -0,0 +1,205 @@
+"""
+Batch rendering: apply the same chain of effects from lab.py to many WAV
+files, fanned out across a pool of worker processes.
+
+    python batch.py "sounds/*.wav" rendered/ --chain chain.json --workers 8
+
+The chain is a list of [effect, arguments] steps, applied in order.  Kernel
+arguments may name a kernel builder from lab.py instead of listing the taps:
+
+    [["convolve", {"kernel": {"bass_boost_kernel": [1000, 1.5]}}],
+     ["echo", {"num_echoes": 3, "delay": 0.25, "scale": 0.5}]]
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import lab
+
+# effects that can appear in a chain, mapped to whether they need stereo input
+EFFECTS = {
+    "backwards": False,
+    "convolve": False,
+    "echo": False,
+    "pan": True,
+    "remove_vocals": True,
+}
+
+# functions that may stand in for an argument, as {"name": [args...]}
+BUILDERS = {
+    "bass_boost_kernel": lab.bass_boost_kernel,
+}
+
+# effects that can work on the loaded sound's own buffers
+INPLACE = {"backwards", "pan", "remove_vocals"}
+
+
+def render_batch(sources, chain, out_dir, workers=None, stereo=None,
+                 progress=None):
+    """
+    Loads every WAV file in sources (a directory, a glob pattern, or a list
+    of paths), applies the effect chain to it and writes the result to a file
+    of the same name in out_dir, using a pool of workers processes (one per
+    core by default).
+
+    stereo picks how files are loaded; by default they are loaded as stereo
+    when the first effect needs it.  progress, if given, is called as
+    progress(done, total, result) after each file finishes.
+
+    Returns the list of per-file results in completion order.  Each one is a
+    dictionary with the input and output paths, the number of frames and the
+    load/effects/write/total times in seconds, or an "error" message if that
+    file failed.
+    """
+    paths = find_wavs(sources)
+    chain = normalize_chain(chain)
+    if stereo is None:
+        stereo = bool(chain) and EFFECTS[chain[0][0]]
+    os.makedirs(out_dir, exist_ok=True)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(render_file, path, chain, out_dir, stereo): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:  # report the failure and keep going
+                result = {"file": futures[future], "error": repr(exc)}
+            results.append(result)
+            if progress is not None:
+                progress(len(results), len(paths), result)
+    return results
+
+
+def render_file(path, chain, out_dir, stereo=False):
+    """
+    Renders a single file through a normalized effect chain, timing each
+    stage.  This is the unit of work that render_batch hands to the pool.
+    """
+    start = time.perf_counter()
+    sound = lab.load_wav(path, stereo=stereo)
+    loaded = time.perf_counter()
+    for name, kwargs in chain:
+        kwargs = _resolve(kwargs)
+        if name in INPLACE:
+            # the worker owns the sound, so there is no need to copy it
+            kwargs.setdefault("inplace", True)
+        sound = getattr(lab, name)(sound, **kwargs)
+    processed = time.perf_counter()
+    output = os.path.join(out_dir, os.path.basename(path))
+    lab.write_wav(sound, output)
+    done = time.perf_counter()
+
+    frames = len(sound["samples"] if "samples" in sound else sound["left"])
+    return {
+        "file": path,
+        "output": output,
+        "frames": frames,
+        "load": loaded - start,
+        "effects": processed - loaded,
+        "write": done - processed,
+        "total": done - start,
+    }
+
+
+def find_wavs(sources):
+    """
+    Expands a directory, glob pattern or list of paths into a sorted list of
+    WAV file paths.
+    """
+    if not isinstance(sources, str):
+        return sorted(sources)
+    if os.path.isdir(sources):
+        sources = os.path.join(sources, "*.wav")
+    return sorted(glob.glob(sources))
+
+
+def normalize_chain(chain):
+    """
+    Checks an effect chain and returns it as a list of (name, kwargs) pairs.
+    Steps may be given as "name", [name] or [name, kwargs].
+    """
+    steps = []
+    for step in chain:
+        if isinstance(step, str):
+            step = (step,)
+        name, kwargs = step[0], dict(step[1]) if len(step) > 1 else {}
+        if name not in EFFECTS:
+            raise ValueError(f"unknown effect in chain: {name!r}")
+        steps.append((name, kwargs))
+    return steps
+
+
+def _resolve(kwargs):
+    """
+    Replaces {"builder": [args...]} arguments with the builder's result.
+    """
+    resolved = {}
+    for key, value in kwargs.items():
+        if isinstance(value, dict) and len(value) == 1:
+            (builder, args), = value.items()
+            if builder in BUILDERS:
+                value = BUILDERS[builder](*args)
+        resolved[key] = value
+    return resolved
+
+
+def _print_progress(done, total, result):
+    """
+    Default progress report: one line per finished file on stderr.
+    """
+    name = os.path.basename(result["file"])
+    if "error" in result:
+        status = "FAILED " + result["error"]
+    else:
+        status = (
+            f"{result['total']:.2f}s (load {result['load']:.2f}s, "
+            f"effects {result['effects']:.2f}s, write {result['write']:.2f}s)"
+        )
+    print(f"[{done}/{total}] {name}: {status}", file=sys.stderr)
+
+
+def main(argv=None):
+    """
+    Command-line entry point; returns the process exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("sources", help="directory or glob pattern of WAV files")
+    parser.add_argument("out_dir", help="directory to write rendered files to")
+    parser.add_argument("--chain", required=True,
+                        help="JSON file (or literal JSON) with the effect chain")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument("--stereo", action="store_true", default=None,
+                        help="load files as stereo")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.chain):
+        with open(args.chain, encoding="utf-8") as f:
+            chain = json.load(f)
+    else:
+        chain = json.loads(args.chain)
+
+    start = time.perf_counter()
+    results = render_batch(args.sources, chain, args.out_dir, args.workers,
+                           args.stereo, progress=_print_progress)
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for result in results if "error" in result)
+    print(
+        f"rendered {len(results) - failed}/{len(results)} files in "
+        f"{elapsed:.2f}s ({len(results) / elapsed if elapsed else 0:.2f} files/s)",
+        file=sys.stderr,
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+"""
+Benchmarks for the effects in lab.py.
+
+    python bench.py --out results.json
+    python bench.py --max-seconds 3600 --compare baseline.json
+
+Every effect (plus load_wav and write_wav) is run on synthetic sounds of
+increasing length, and convolve additionally on kernels of increasing size.
+For each case the wall time, throughput (input samples per second) and peak
+traced memory are recorded as JSON.  With --compare, cases whose throughput
+dropped or whose peak memory grew by more than the tolerance against a saved
+baseline are reported, and the exit status is 1.
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import tempfile
+import tracemalloc
+from array import array
+
+import lab
+
+RATE = 44100
+
+# sound lengths benchmarked, in seconds, from 1 s up to 1 h
+SCALES = (1, 10, 60, 600, 3600)
+
+# convolution kernel sizes benchmarked, in taps
+KERNEL_SIZES = (3, 31, 301, 2001)
+
+# samples generated at a time by synthetic_sound
+SYNTH_CHUNK = 65536
+
+EFFECTS = (
+    "backwards",
+    "mix",
+    "echo",
+    "pan",
+    "remove_vocals",
+    "convolve",
+    "load_wav",
+    "write_wav",
+)
+
+
+def synthetic_sound(seconds, stereo=False, rate=RATE):
+    """
+    Returns a deterministic test Sound: a chord of a few sines, with a
+    different phase on the right channel.
+    """
+    length = round(seconds * rate)
+    step = 2 * math.pi / rate
+
+    def channel(phase):
+        # generated a chunk at a time straight into the array, so that only
+        # one chunk is ever held as Python floats
+        samples = array("d")
+        for start in range(0, length, SYNTH_CHUNK):
+            samples.extend(
+                0.3 * math.sin(220 * step * i + phase)
+                + 0.2 * math.sin(277 * step * i)
+                + 0.1 * math.sin(3300 * step * i - phase)
+                for i in range(start, min(start + SYNTH_CHUNK, length))
+            )
+        return samples
+
+    if stereo:
+        return lab.Sound(rate=rate, left=channel(0), right=channel(1))
+    return lab.Sound(rate=rate, samples=channel(0))
+
+
+def run_benchmarks(scales=SCALES, kernel_sizes=KERNEL_SIZES, effects=EFFECTS,
+                   repeat=1, progress=None):
+    """
+    Runs the benchmark cases and returns a list of result dictionaries with
+    the effect, the sound length in seconds, the kernel size (for convolve),
+    the number of input samples, the best wall time over repeat runs, the
+    throughput in samples per second and the peak traced memory in bytes.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for seconds in scales:
+            mono = synthetic_sound(seconds)
+            stereo = synthetic_sound(seconds, stereo=True)
+            wav = os.path.join(tmp, "bench.wav")
+            lab.write_wav(mono, wav)
+            cases = {
+                "backwards": lambda: lab.backwards(mono),
+                "mix": lambda: lab.mix(mono, mono, 0.3),
+                "echo": lambda: lab.echo(mono, 3, 0.25, 0.5),
+                "pan": lambda: lab.pan(stereo),
+                "remove_vocals": lambda: lab.remove_vocals(stereo),
+                "load_wav": lambda: lab.load_wav(wav),
+                "write_wav": lambda: lab.write_wav(mono, os.path.join(tmp, "out.wav")),
+            }
+            for effect in effects:
+                if effect == "convolve":
+                    for taps in kernel_sizes:
+                        kernel = _kernel(taps)
+                        result = _measure(
+                            lambda: lab.convolve(mono, kernel), repeat
+                        )
+                        results.append(_record(effect, seconds, taps, result))
+                        if progress is not None:
+                            progress(results[-1])
+                else:
+                    result = _measure(cases[effect], repeat)
+                    results.append(_record(effect, seconds, None, result))
+                    if progress is not None:
+                        progress(results[-1])
+            del mono, stereo, cases
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compares results against baseline results (both as returned by
+    run_benchmarks) and returns a list of (result, baseline result, reasons)
+    for every case whose throughput fell, or peak memory rose, by more than
+    the given fraction.
+    """
+    previous = {_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+        reasons = []
+        if result["throughput"] < old["throughput"] * (1 - tolerance):
+            reasons.append(
+                f"throughput {old['throughput']:.3g} -> {result['throughput']:.3g} samples/s"
+            )
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + tolerance):
+            reasons.append(
+                f"peak memory {old['peak_bytes']} -> {result['peak_bytes']} bytes"
+            )
+        if reasons:
+            regressions.append((result, old, reasons))
+    return regressions
+
+
+def _kernel(taps):
+    """
+    Returns a bass-boost kernel with about the given number of taps.
+    """
+    return lab.bass_boost_kernel(max(taps // 2 - 1, 0), 1.5)
+
+
+def _measure(func, repeat):
+    """
+    Returns (best wall time, peak traced bytes) for func.  Timing runs
+    without tracemalloc, since tracing slows allocation-heavy code down.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def _record(effect, seconds, taps, measurement):
+    """
+    Builds the result dictionary for one benchmark case.
+    """
+    elapsed, peak = measurement
+    samples = round(seconds * RATE)
+    return {
+        "effect": effect,
+        "seconds": seconds,
+        "kernel": taps,
+        "samples": samples,
+        "time": elapsed,
+        "throughput": samples / elapsed if elapsed else float("inf"),
+        "peak_bytes": peak,
+    }
+
+
+def _key(result):
+    """
+    Identifies a benchmark case across runs.
+    """
+    return result["effect"], result["seconds"], result["kernel"]
+
+
+def _print_result(result):
+    """
+    Prints one benchmark result as a table row on stderr.
+    """
+    kernel = f"K={result['kernel']}" if result["kernel"] else ""
+    print(
+        f"{result['effect']:>14} {result['seconds']:>7g}s {kernel:>7} "
+        f"{result['time']:10.4f}s {result['throughput']:14.0f} samples/s "
+        f"{result['peak_bytes'] / 2**20:10.1f} MiB",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    """
+    Command-line entry point; returns the process exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--max-seconds", type=float, default=60,
+                        help="longest sound to benchmark (default: 60)")
+    parser.add_argument("--max-kernel", type=int, default=max(KERNEL_SIZES),
+                        help="largest convolution kernel to benchmark")
+    parser.add_argument("--effects", nargs="+", choices=EFFECTS, default=EFFECTS)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="time each case this many times, keeping the best")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="JSON results to check for regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed fractional slowdown / growth (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        [s for s in SCALES if s <= args.max_seconds],
+        [k for k in KERNEL_SIZES if k <= args.max_kernel],
+        args.effects,
+        args.repeat,
+        progress=_print_result,
+    )
+    report = {"rate": RATE, "python": sys.version, "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for result, _, reasons in regressions:
+            kernel = f" K={result['kernel']}" if result["kernel"] else ""
+            print(f"REGRESSION {result['effect']} {result['seconds']:g}s{kernel}: "
+                  + "; ".join(reasons), file=sys.stderr)
+        if regressions:
+            return 1
+        print("no regressions", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+Lazy effect graphs over the effects in lab.py.
+
+Building a graph computes nothing; evaluating it pulls the sound through
+every node block by block, using the streaming versions of the effects, so
+peak memory is proportional to the block size rather than to the depth of
+the chain times the length of the sound:
+
+    car = graph.load("sounds/car.wav", stereo=True)
+    synth = graph.load("sounds/synth.wav").echo(3, 0.2, 0.5)
+    graph.mix(car.remove_vocals(), synth, 0.3).write("out.wav")
+
+A node may feed several others (the graph is a DAG); its blocks are then
+shared between its consumers rather than computed twice.
+"""
+
+import itertools
+
+import lab
+
+# default number of frames per block when evaluating a graph
+BLOCK_FRAMES = 4096
+
+
+class Node:
+    """
+    A lazily evaluated sound.  Every node knows its sampling rate, whether it
+    is stereo and its length in frames before anything is computed.
+
+    Node itself is abstract: the node classes in this module (Source,
+    WavSource and one class per effect) are its only implementations, and
+    each of them provides _build.
+    """
+
+    # whether read() can decode an arbitrary window of this node
+    seekable = False
+
+    def __init__(self, inputs, rate, stereo, length):
+        self.inputs = tuple(inputs)
+        self.rate = rate
+        self.stereo = stereo
+        self.length = length
+
+    def backwards(self):
+        """
+        Returns a node that reverses this one.
+        """
+        return Backwards(self)
+
+    def mix(self, other, p):
+        """
+        Returns a node mixing p times this node with 1-p times other.
+        """
+        return Mix(self, other, p)
+
+    def convolve(self, kernel):
+        """
+        Returns a node convolving this one with kernel.
+        """
+        return Convolve(self, kernel)
+
+    def echo(self, num_echoes, delay, scale):
+        """
+        Returns a node adding echoes to this one.
+        """
+        return Echo(self, num_echoes, delay, scale)
+
+    def pan(self):
+        """
+        Returns a node panning this (stereo) node from left to right.
+        """
+        return Pan(self)
+
+    def remove_vocals(self):
+        """
+        Returns a mono node with the vocals of this (stereo) node removed.
+        """
+        return RemoveVocals(self)
+
+    def read(self, start, stop):
+        """
+        Computes frames start through stop - 1 of a seekable node.  Raises
+        TypeError for nodes that can only be streamed.
+        """
+        raise TypeError(f"{type(self).__name__} is not seekable")
+
+    def blocks(self, block_frames=BLOCK_FRAMES):
+        """
+        Evaluates the graph, yielding the result as a sequence of Sounds.
+        """
+        users = {}
+        _count_users(self, users, set())
+        return self._stream(block_frames, users, {})
+
+    def render(self, block_frames=BLOCK_FRAMES):
+        """
+        Evaluates the graph into a single Sound.
+        """
+        return _collect(self, self.blocks(block_frames))
+
+    def write(self, filename, block_frames=BLOCK_FRAMES):
+        """
+        Evaluates the graph straight into a WAV file.
+        """
+        lab.write_wav_chunks(self.blocks(block_frames), filename)
+
+    def _streamed_inputs(self):
+        """
+        The inputs whose blocks this node consumes during evaluation.
+        """
+        return self.inputs
+
+    def _build(self, streams, block_frames):
+        """
+        Returns the iterator of this node's blocks, given iterators over the
+        blocks of its streamed inputs.  Implemented by each node class.
+        """
+        raise NotImplementedError
+
+    def _stream(self, block_frames, users, streams):
+        """
+        Returns an iterator over this node's blocks, teeing it if several
+        nodes consume it.
+        """
+        if id(self) not in streams:
+            inputs = [
+                node._stream(block_frames, users, streams)
+                for node in self._streamed_inputs()
+            ]
+            blocks = self._build(inputs, block_frames)
+            count = users.get(id(self), 1)
+            if count > 1:
+                streams[id(self)] = list(itertools.tee(blocks, count))
+            else:
+                streams[id(self)] = [blocks]
+        return streams[id(self)].pop()
+
+
+class Source(Node):
+    """
+    An in-memory sound.
+    """
+
+    seekable = True
+
+    def __init__(self, sound):
+        stereo = "samples" not in sound
+        length = len(sound["left"] if stereo else sound["samples"])
+        super().__init__((), sound["rate"], stereo, length)
+        self.sound = sound
+
+    def read(self, start, stop):
+        out = lab.Sound(rate=self.rate)
+        for name in _names(self):
+            out[name] = self.sound[name][start:stop]
+        return out
+
+    def _build(self, streams, block_frames):
+        for start in range(0, self.length, block_frames):
+            yield self.read(start, start + block_frames)
+
+
+class WavSource(Node):
+    """
+    A WAV file, read through a memory map so that only the blocks
+    being processed are ever decoded.
+    """
+
+    seekable = True
+
+    def __init__(self, filename, stereo=False):
+        with lab.WavMap(filename) as wav:
+            super().__init__((), wav.rate, stereo, len(wav))
+        self.filename = filename
+
+    def read(self, start, stop):
+        with lab.WavMap(self.filename) as wav:
+            return wav.read(start, stop, self.stereo)
+
+    def _build(self, streams, block_frames):
+        with lab.WavMap(self.filename) as wav:
+            for start in range(0, self.length, block_frames):
+                yield wav.read(start, start + block_frames, self.stereo)
+
+
+class Backwards(Node):
+    """
+    Reverses its input.  If the input is seekable its blocks are read from
+    the end; otherwise the input has to be rendered in full first.
+    """
+
+    def __init__(self, node):
+        super().__init__((node,), node.rate, node.stereo, node.length)
+        self.seekable = node.seekable
+
+    def read(self, start, stop):
+        start, stop, _ = slice(start, stop).indices(self.length)
+        stop = max(start, stop)
+        block = self.inputs[0].read(self.length - stop, self.length - start)
+        for name in _names(self):
+            block[name] = block[name][::-1]
+        return block
+
+    def _streamed_inputs(self):
+        return () if self.seekable else self.inputs
+
+    def _build(self, streams, block_frames):
+        if self.seekable:
+            for start in range(0, self.length, block_frames):
+                yield self.read(start, start + block_frames)
+        else:
+            whole = Source(_collect(self.inputs[0], streams[0]))
+            yield from Backwards(whole)._build((), block_frames)
+
+
+class Mix(Node):
+    """
+    Mixes p times its first input with 1-p times its second.
+    """
+
+    def __init__(self, node1, node2, p):
+        if node1.rate != node2.rate:
+            raise ValueError("cannot mix sounds with different rates")
+        if node1.stereo != node2.stereo:
+            raise ValueError("cannot mix mono and stereo sounds")
+        length = max(node1.length, node2.length)
+        super().__init__((node1, node2), node1.rate, node1.stereo, length)
+        self.p = p
+
+    def _build(self, streams, block_frames):
+        return lab.stream_mix(streams[0], streams[1], self.p)
+
+
+class Convolve(Node):
+    """
+    Convolves its input with a kernel.
+    """
+
+    def __init__(self, node, kernel):
+        length = node.length + len(kernel) - 1
+        super().__init__((node,), node.rate, node.stereo, length)
+        self.kernel = kernel
+
+    def _build(self, streams, block_frames):
+        return lab.stream_convolve(streams[0], self.kernel)
+
+
+class Echo(Node):
+    """
+    Adds num_echoes delayed and scaled copies of its input.
+    """
+
+    def __init__(self, node, num_echoes, delay, scale):
+        length = node.length + round(delay * node.rate) * num_echoes
+        super().__init__((node,), node.rate, node.stereo, length)
+        self.num_echoes, self.delay, self.scale = num_echoes, delay, scale
+
+    def _build(self, streams, block_frames):
+        return lab.stream_echo(streams[0], self.num_echoes, self.delay, self.scale)
+
+
+class Pan(Node):
+    """
+    Pans a stereo input from the left channel to the right.
+    """
+
+    def __init__(self, node):
+        if not node.stereo:
+            raise ValueError("pan needs a stereo sound")
+        super().__init__((node,), node.rate, True, node.length)
+        self.seekable = node.seekable
+
+    def read(self, start, stop):
+        start, _, _ = slice(start, stop).indices(self.length)
+        block = self.inputs[0].read(start, stop)
+        return next(lab.stream_pan([block], self.length, start))
+
+    def _build(self, streams, block_frames):
+        return lab.stream_pan(streams[0], self.length)
+
+
+class RemoveVocals(Node):
+    """
+    Turns a stereo input into mono by subtracting its right channel from its
+    left.
+    """
+
+    def __init__(self, node):
+        if not node.stereo:
+            raise ValueError("remove_vocals needs a stereo sound")
+        super().__init__((node,), node.rate, False, node.length)
+        self.seekable = node.seekable
+
+    def read(self, start, stop):
+        return lab.remove_vocals(self.inputs[0].read(start, stop))
+
+    def _build(self, streams, block_frames):
+        return lab.stream_remove_vocals(streams[0])
+
+
+def source(sound):
+    """
+    Returns a graph node for an in-memory sound.
+    """
+    return Source(sound)
+
+
+def load(filename, stereo=False):
+    """
+    Returns a graph node for a WAV file, which is only read during evaluation.
+    """
+    return WavSource(filename, stereo)
+
+
+def mix(node1, node2, p):
+    """
+    Returns a node mixing p times node1 with 1-p times node2.
+    """
+    return Mix(node1, node2, p)
+
+
+def _names(node):
+    """
+    Returns the channel names of a node's blocks.
+    """
+    return ("left", "right") if node.stereo else ("samples",)
+
+
+def _count_users(node, users, seen):
+    """
+    Counts, for every node in the graph, how many nodes stream its blocks.
+    """
+    if id(node) in seen:
+        return
+    seen.add(id(node))
+    for child in node._streamed_inputs():
+        users[id(child)] = users.get(id(child), 0) + 1
+        _count_users(child, users, seen)
+
+
+def _collect(node, blocks):
+    """
+    Concatenates a node's blocks into a single Sound.
+    """
+    out = lab.Sound(rate=node.rate, **{name: [] for name in _names(node)})
+    for block in blocks:
+        for name in _names(node):
+            out[name].extend(block[name])
+    return out
@@ -0,0 +1,236 @@
+"""
+Opt-in profiling of the functions in lab.py.
+
+    with instrument.profile():
+        sound = lab.load_wav("sounds/car.wav")
+        lab.write_wav(lab.convolve(sound, kernel), "out.wav")
+
+prints, when the block exits, how many times each function ran, the wall
+time it took, the samples it processed and (with memory=True) its peak
+allocation.  enable() and disable() do the same without the report, and
+stats() returns what has been recorded so far.
+
+While enabled, the module-level functions of lab are replaced by timing
+wrappers; disable() puts the originals back, so that there is no cost at
+all when profiling is off.  Times are inclusive: when mix calls mix_many,
+both are charged for it.  Only the current process is instrumented, so
+worker processes (convolve_parallel, batch rendering) are not seen.
+"""
+
+import sys
+import time
+import inspect
+import functools
+import tracemalloc
+import contextlib
+
+import lab
+
+
+class Stats:
+    """
+    What has been recorded for one function.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.time = 0.0
+        self.samples = 0
+        self.peak_bytes = 0
+
+    def __repr__(self):
+        return (
+            f"Stats(calls={self.calls}, time={self.time:.6f}, "
+            f"samples={self.samples}, peak_bytes={self.peak_bytes})"
+        )
+
+
+# recorded statistics, keyed on function name
+_STATS = {}
+
+# the functions currently replaced by wrappers, keyed on name
+_ORIGINALS = {}
+
+# [traced bytes at entry, peak traced bytes] of the calls in progress,
+# innermost last
+_PEAKS = []
+
+
+def public_functions():
+    """
+    Returns the names of the public module-level functions of lab.
+    """
+    return sorted(
+        name for name, value in vars(lab).items()
+        if inspect.isfunction(value) and value.__module__ == lab.__name__
+        and not name.startswith("_")
+    )
+
+
+def enable(names=None, memory=False):
+    """
+    Starts recording calls to the named functions of lab (by default, every
+    public one; private helpers such as "_decode_samples" may be named too).
+    With memory=True peak allocations are traced as well, which slows
+    allocation-heavy code down noticeably.
+    """
+    for name in public_functions() if names is None else names:
+        if name in _ORIGINALS:
+            continue
+        func = getattr(lab, name)
+        _ORIGINALS[name] = func
+        setattr(lab, name, _wrap(name, func, memory))
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _ORIGINALS[None] = tracemalloc.stop
+
+
+def disable():
+    """
+    Restores the original functions, and stops memory tracing if enable
+    started it.  Recorded statistics are kept.
+    """
+    stop = _ORIGINALS.pop(None, None)
+    for name, func in _ORIGINALS.items():
+        setattr(lab, name, func)
+    _ORIGINALS.clear()
+    if stop is not None:
+        stop()
+
+
+def enabled():
+    """
+    Returns whether any function is currently instrumented.
+    """
+    return bool(_ORIGINALS)
+
+
+def stats():
+    """
+    Returns the statistics recorded so far, as a dictionary mapping function
+    names to Stats.
+    """
+    return dict(_STATS)
+
+
+def reset():
+    """
+    Forgets all recorded statistics.
+    """
+    _STATS.clear()
+
+
+def report(file=None):
+    """
+    Prints the recorded statistics as a table, slowest function first.
+    """
+    file = sys.stderr if file is None else file
+    print(f"{'function':>22} {'calls':>7} {'time':>10} {'samples':>12} "
+          f"{'samples/s':>12} {'peak MiB':>9}", file=file)
+    for name, entry in sorted(_STATS.items(), key=lambda item: -item[1].time):
+        rate = entry.samples / entry.time if entry.time else 0
+        print(
+            f"{name:>22} {entry.calls:>7} {entry.time:>9.4f}s "
+            f"{entry.samples:>12} {rate:>12.0f} {entry.peak_bytes / 2**20:>9.1f}",
+            file=file,
+        )
+
+
+@contextlib.contextmanager
+def profile(names=None, memory=False, file=None):
+    """
+    Context manager that records only what runs inside it, then disables
+    instrumentation and prints a report to file (stderr by default; pass
+    file=False for no report).  Yields the statistics dictionary, which is
+    filled in as calls complete.
+    """
+    reset()
+    enable(names, memory)
+    try:
+        yield _STATS
+    finally:
+        disable()
+        if file is not False:
+            report(file)
+
+
+def _wrap(name, func, memory):
+    """
+    Returns a recording wrapper around one of lab's functions.  Generators
+    (the streaming functions) are timed across every chunk they produce.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        entry = _STATS.setdefault(name, Stats())
+        entry.calls += 1
+        start = _enter(memory)
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            entry.time += time.perf_counter() - start
+            _leave(entry, memory)
+        if inspect.isgenerator(result):
+            return _timed_chunks(entry, result, memory)
+        entry.samples += _count_samples(args) or _count_samples([result])
+        return result
+
+    return wrapper
+
+
+def _timed_chunks(entry, chunks, memory):
+    """
+    Passes on the chunks of a generator, charging the time spent producing
+    them, and the samples they hold, to entry.
+    """
+    while True:
+        start = _enter(memory)
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
+        finally:
+            entry.time += time.perf_counter() - start
+            _leave(entry, memory)
+        entry.samples += _count_samples([chunk])
+        yield chunk
+
+
+def _enter(memory):
+    """
+    Starts measuring a call; returns its start time.
+    """
+    if memory:
+        # fold the peak so far into the calls in progress before resetting
+        current, peak = tracemalloc.get_traced_memory()
+        for frame in _PEAKS:
+            frame[1] = max(frame[1], peak)
+        tracemalloc.reset_peak()
+        _PEAKS.append([current, current])
+    return time.perf_counter()
+
+
+def _leave(entry, memory):
+    """
+    Finishes measuring a call, recording its peak allocation in entry.
+    """
+    if memory:
+        base, peak = _PEAKS.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        entry.peak_bytes = max(entry.peak_bytes, peak - base)
+        for frame in _PEAKS:
+            frame[1] = max(frame[1], peak)
+
+
+def _count_samples(values):
+    """
+    Counts the samples held by the Sounds among values (looking one level
+    into lists of Sounds, as mix_many takes).
+    """
+    total = 0
+    for value in values:
+        if isinstance(value, (list, tuple)) and value and isinstance(value[0], dict):
+            total += _count_samples(value)
+        elif isinstance(value, dict) and "rate" in value:
+            total += sum(len(value[name]) for name in lab._channel_names(value)
+                         if name in value)
+    return total
@@ -3,22 +3,148 @@
 Audio Processing
 """
 
-import wave
+import os
+import sys
+import mmap
+import math
+import cmath
 import struct
-# No Additional Imports Allowed!
+import functools
+from array import array
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+# Standard library only: no third-party imports!
 
+# kernels with at least this many nonzero taps use the FFT overlap-add engine
+FFT_CONVOLVE_THRESHOLD = 32
 
-def backwards(sound):
+# number of frames decoded or encoded at a time by the WAV helpers
+WAV_CHUNK_FRAMES = 1 << 16
+
+# filter taps per polyphase branch used by resample
+RESAMPLE_TAPS = 32
+
+# directory where bass_boost_kernel persists the kernels it builds, if set
+KERNEL_CACHE_DIR = None
+
+# cache of FFT twiddle factors, keyed on transform length
+_TWIDDLES = {}
+
+
+class Sound(dict):
+    """
+    Dictionary representation of a sound whose channels ("samples" for mono,
+    "left" and "right" for stereo) are stored as array('d') buffers rather
+    than lists of floats, at 8 bytes per sample.
+
+    Sounds with any number of channels are stored as a single "interleaved"
+    buffer holding frame after frame of "channels" samples each, in WAV
+    channel order.
+
+    Sound is a dict, so code written for {"rate": ..., "samples": [...]}
+    keeps working unchanged.  Channels given as lists (or any other iterable
+    of numbers) are converted when the Sound is built or a channel is set.
+    """
+
+    CHANNELS = ("samples", "left", "right", "interleaved")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in self.CHANNELS:
+            if name in self:
+                super().__setitem__(name, _as_array(self[name]))
+
+    def __setitem__(self, key, value):
+        if key in self.CHANNELS:
+            value = _as_array(value)
+        super().__setitem__(key, value)
+
+    def copy(self):
+        """
+        Returns a copy of the sound with its own channel buffers.
+        """
+        return Sound(
+            {k: v[:] if k in self.CHANNELS else v for k, v in self.items()}
+        )
+
+    def view(self, channel):
+        """
+        Returns a zero-copy memoryview of the given channel's buffer.
+        """
+        return memoryview(self[channel])
+
+
+def _as_array(values):
+    """
+    Returns values as an array('d'), without copying if it already is one.
+    """
+    if isinstance(values, array) and values.typecode == "d":
+        return values
+    return array("d", values)
+
+def _zeros(length):
+    """
+    Returns a zero-filled array('d') of the given length.
+    """
+    return array("d", [0.0]) * length
+
+def _add_into(out, values, scale=1, offset=0):
+    """
+    Adds scale times values into the buffer out, starting at offset, a
+    block of WAV_CHUNK_FRAMES values at a time.  Values running past the end
+    of out are dropped.
+    """
+    end = min(offset + len(values), len(out))
+    for start in range(offset, end, WAV_CHUNK_FRAMES):
+        stop = min(start + WAV_CHUNK_FRAMES, end)
+        out[start:stop] = array("d", [
+            acc + scale * v
+            for acc, v in zip(out[start:stop], values[start - offset:stop - offset])
+        ])
+
+def _channel_names(sound):
+    """
+    Returns the names of the channels a sound holds.
+    """
+    if "samples" in sound:
+        return ("samples",)
+    if "interleaved" in sound:
+        return ("interleaved",)
+    return ("left", "right")
+
+def _length(sound):
+    """
+    Returns the number of frames in a sound.
+    """
+    if "interleaved" in sound:
+        return len(sound["interleaved"]) // sound["channels"]
+    return len(sound[_channel_names(sound)[0]])
+
+def _map_blocks(buffer, func, offset=0, step=1):
+    """
+    Replaces buffer[offset::step] in place with func(values, start), applied
+    WAV_CHUNK_FRAMES values at a time, where start is the index (counted in
+    steps) of the first of the values.
+    """
+    count = len(range(offset, len(buffer), step))
+    for start in range(0, count, WAV_CHUNK_FRAMES):
+        stop = min(start + WAV_CHUNK_FRAMES, count)
+        window = slice(offset + start * step, offset + (stop - 1) * step + 1, step)
+        buffer[window] = func(buffer[window], start)
+
+def backwards(sound, inplace=False):
     """
     Reverses the order of a sound's samples
+
+    With inplace=True the sound's own buffer is reversed and the sound
+    itself is returned, without allocating a second buffer.
     """
-    new = sound.copy()
-    backwards_s = new.get("samples").copy()
-    backwards_s.reverse()
-    new["samples"] = backwards_s
-    return new
+    if inplace:
+        sound["samples"].reverse()
+        return sound
+    return Sound(sound, samples=_as_array(sound["samples"])[::-1])
 
-def mix(sound1, sound2, p):
+def mix(sound1, sound2, p, convert_rate=False):
     """
     Mix 2 sounds according to the mixing parameter p.
 
@@ -27,100 +153,590 @@ def mix(sound1, sound2, p):
     where the resulting sound is p times samples in sound 1 
     and 1-p times samples in sound 2.
 
+    With convert_rate=True, sound 2 is instead resampled to the sampling rate
+    of sound 1 before mixing.
+
     Returns python dictionary of new mixed sound.
     
     """
     if sound1.get("rate") != sound2.get("rate"):
-        return None
+        if not convert_rate:
+            return None
+        sound2 = resample(sound2, sound1["rate"])
+    return mix_many([sound1, sound2], [p, 1 - p])
 
-    rate = sound1["rate"]
-    sound1 = sound1["samples"]
-    sound2 = sound2["samples"]
-    maximum = max(len(sound1), len(sound2))
-    mixed = []
-    i = 0
-    while i < maximum:
-        s1 = sound1[i] * p if i < len(sound1) else 0
-        s2 = sound2[i] * (1 - p) if i < len(sound2) else 0
-        mixed.append(s1 + s2)
-        i += 1
-    return {"rate": rate, "samples": mixed}
-
-def convolve(sound, kernel):
+def mix_many(sounds, gains=None, rate=None):
+    """
+    Mix any number of sounds, scaling sounds[i] by gains[i] (by default each
+    sound gets an equal share, 1/len(sounds)).
+
+    All sounds must have the same sampling rate, or a ValueError is raised,
+    unless a rate is given: sounds at any other rate are then resampled to
+    it first.  The result is as long as the longest sound, and is stereo if any of the
+    sounds is, with mono sounds going to both channels.  Every sound is added
+    straight into one output buffer, so the whole mix is a single pass.
+
+    Multichannel sounds can only be mixed with others that have the same
+    number of channels; their interleaved buffers are mixed as they are.
+    """
+    sounds = list(sounds)
+    if not sounds:
+        raise ValueError("no sounds to mix")
+    if gains is None:
+        gains = [1 / len(sounds)] * len(sounds)
+    elif len(gains) != len(sounds):
+        raise ValueError("need exactly one gain per sound")
+    if rate is not None:
+        sounds = [resample(sound, rate) if sound["rate"] != rate else sound
+                  for sound in sounds]
+    if len({sound["rate"] for sound in sounds}) > 1:
+        raise ValueError("cannot mix sounds with different rates")
+
+    if any("interleaved" in sound for sound in sounds):
+        return _mix_interleaved(sounds, gains)
+
+    stereo = any("samples" not in sound for sound in sounds)
+    names = ("left", "right") if stereo else ("samples",)
+    length = max(_length(sound) for sound in sounds)
+    mixed = Sound(rate=sounds[0]["rate"])
+    for name in names:
+        mixed[name] = _zeros(length)
+    for sound, gain in zip(sounds, gains):
+        for name in names:
+            _add_into(mixed[name], sound[name if name in sound else "samples"], gain)
+    return mixed
+
+def _mix_interleaved(sounds, gains):
+    """
+    mix_many for multichannel sounds.
+    """
+    counts = {sound.get("channels") for sound in sounds}
+    if len(counts) > 1 or not all("interleaved" in sound for sound in sounds):
+        raise ValueError("cannot mix sounds with different channel layouts")
+    (channels,) = counts
+    mixed = Sound(
+        rate=sounds[0]["rate"],
+        channels=channels,
+        interleaved=_zeros(max(len(sound["interleaved"]) for sound in sounds)),
+    )
+    for sound, gain in zip(sounds, gains):
+        _add_into(mixed["interleaved"], sound["interleaved"], gain)
+    return mixed
+
+def convolve(sound, kernel, method="auto"):
     """
     Convolves the sound using the given kernel(filter)
     by shifting and scaling the original sample and 
     combining resulting sequences into the output sound.
-    
+
+    method selects the engine: "direct" accumulates each nonzero kernel
+    tap into the output, "fft" uses block FFT overlap-add, and "auto"
+    picks "fft" once the kernel has FFT_CONVOLVE_THRESHOLD nonzero taps or
+    more, so sparse kernels stay on the direct path.
+    """
+    if method == "auto":
+        nonzero = sum(1 for tap in kernel if tap != 0)
+        method = "fft" if nonzero >= FFT_CONVOLVE_THRESHOLD else "direct"
+    if method == "fft":
+        final = _convolve_fft(sound["samples"], kernel)
+    elif method == "direct":
+        final = _convolve_direct(sound["samples"], kernel)
+    else:
+        raise ValueError(f"unknown convolution method: {method!r}")
+    return Sound(rate=sound["rate"], samples=final)
+
+def _convolve_direct(samples, kernel):
+    """
+    Direct-form convolution that accumulates each kernel tap straight into
+    the output buffer.  Zero taps are skipped, so the cost is proportional
+    to the number of nonzero taps and peak memory stays O(len(samples)).
+    """
+    final = _zeros(len(samples) + len(kernel) - 1)
+    for offset, tap in enumerate(kernel):
+        if tap != 0:
+            _add_into(final, samples, tap, offset)
+    return final
+
+def _convolve_fft(samples, kernel):
+    """
+    Overlap-add convolution: the samples are cut into blocks, each block is
+    convolved with the kernel through a fixed-size FFT, and the results are
+    added into the output at the block's offset.
+
+    Since the kernel is real, two consecutive blocks are packed into the real
+    and imaginary parts of a single transform, and come back out unmixed in
+    the real and imaginary parts of the result.
+    """
+    length, taps = len(samples), len(kernel)
+    final = _zeros(length + taps - 1)
+    if not length or not taps:
+        return final
+
+    # FFT size: ~4x the kernel keeps most of each transform useful output,
+    # but there is no point going past what the whole signal needs
+    size = min(1 << (4 * taps - 1).bit_length(),
+               1 << (length + taps - 2).bit_length())
+    block = size - taps + 1
+    kernel_f = fft(list(kernel) + [0] * (size - taps))
+
+    for start in range(0, length, 2 * block):
+        first = samples[start:start + block]
+        second = samples[start + block:start + 2 * block]
+        packed = [complex(re, im) for re, im in zip(
+            _padded(first, size), _padded(second, size))]
+        spectrum = fft(packed)
+        result = fft([x * h for x, h in zip(spectrum, kernel_f)], inverse=True)
+
+        end = start + len(first) + taps - 1
+        final[start:end] = array(
+            "d", [acc + val.real for acc, val in zip(final[start:end], result)]
+        )
+        if second:
+            start += block
+            end = start + len(second) + taps - 1
+            final[start:end] = array(
+                "d", [acc + val.imag for acc, val in zip(final[start:end], result)]
+            )
+    return final
+
+def _padded(values, size):
+    """
+    Returns values as a list zero-padded to the given size.
+    """
+    return list(values) + [0.0] * (size - len(values))
+
+def fft(values, inverse=False):
     """
-    samples = []  # initialize scaled sample lists
+    Iterative radix-2 FFT of a sequence whose length is a power of 2.
 
-    for i, sample in enumerate(kernel):
-        scaled = [0] * i  # offset scaled sound by filter index
-        scaled += [sample * s for s in sound["samples"]]
-        samples.append(scaled)
+    Returns a new list of complex numbers.  The inverse transform includes
+    the 1/n scaling, so fft(fft(x), inverse=True) gives back x.
+    """
+    size = len(values)
+    if size & (size - 1):
+        raise ValueError("FFT length must be a power of 2")
+    out = list(values)
+
+    # bit-reversal permutation
+    j = 0
+    for i in range(1, size):
+        bit = size >> 1
+        while j & bit:
+            j ^= bit
+            bit >>= 1
+        j |= bit
+        if i < j:
+            out[i], out[j] = out[j], out[i]
+
+    table = _twiddles(size)
+    span = 2
+    while span <= size:
+        half = span // 2
+        factors = table[::size // span]
+        if inverse:
+            factors = [w.conjugate() for w in factors]
+        if half <= size // span:
+            # few twiddles, many butterfly groups: one strided pass per twiddle
+            for k, w in enumerate(factors):
+                top = out[k::span]
+                bottom = [w * b for b in out[k + half::span]]
+                out[k::span] = [a + b for a, b in zip(top, bottom)]
+                out[k + half::span] = [a - b for a, b in zip(top, bottom)]
+        else:
+            # few large groups: one contiguous pass per group
+            for start in range(0, size, span):
+                mid, end = start + half, start + span
+                top = out[start:mid]
+                bottom = [w * b for w, b in zip(factors, out[mid:end])]
+                out[start:mid] = [a + b for a, b in zip(top, bottom)]
+                out[mid:end] = [a - b for a, b in zip(top, bottom)]
+        span *= 2
+
+    if inverse:
+        out = [v / size for v in out]
+    return out
 
-    # combine samples into one list
-    final_length = len(sound["samples"]) + len(kernel) - 1
-    final = [0] * final_length
-    for sample in samples:
-        for i, val in enumerate(sample):
-            final[i] += val
-    return {"rate": sound["rate"], "samples": final}
+def _twiddles(size):
+    """
+    Returns the cached table of e^(-2j*pi*k/size) for k < size/2.
+    """
+    table = _TWIDDLES.get(size)
+    if table is None:
+        table = [cmath.exp(-2j * cmath.pi * k / size) for k in range(size // 2)]
+        _TWIDDLES[size] = table
+    return table
+
+def convolve_parallel(sound, kernel, workers=None, segments=None):
+    """
+    Convolves like convolve, but splits the samples into segments (one per
+    worker by default) that are convolved in a pool of worker processes (one
+    per core by default).
 
-def echo(sound, num_echoes, delay, scale):
+    The samples and the output live in shared memory, so only the segment
+    bounds and the kernel are sent to the workers.  Each worker writes the
+    first part of its segment's result straight into the output and returns
+    the remaining len(kernel) - 1 samples, which are overlap-added here.
+    """
+    samples = _as_array(sound["samples"])
+    length, taps = len(samples), len(kernel)
+    workers = workers or os.cpu_count() or 1
+    segments = min(segments or workers, length)
+    if segments <= 1 or taps == 0:
+        return convolve(sound, kernel)
+
+    source = shared_memory.SharedMemory(create=True, size=8 * length)
+    target = shared_memory.SharedMemory(create=True, size=8 * (length + taps - 1))
+    try:
+        source.buf[:8 * length] = memoryview(samples).cast("B")
+        # the blocks may be rounded up to whole pages, so slice explicitly
+        target.buf[8 * length:8 * (length + taps - 1)] = bytes(8 * (taps - 1))
+
+        step = -(-length // segments)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = []
+            for start in range(0, length, step):
+                stop = min(start + step, length)
+                futures.append((stop, pool.submit(
+                    _convolve_segment, source.name, target.name, start, stop, kernel
+                )))
+            tails = [(stop, future.result()) for stop, future in futures]
+
+        final = array("d")
+        final.frombytes(target.buf[:8 * (length + taps - 1)])
+    finally:
+        for block in (source, target):
+            block.close()
+            block.unlink()
+
+    for stop, tail in tails:
+        _add_into(final, tail, 1, stop)
+    return Sound(rate=sound["rate"], samples=final)
+
+def _convolve_segment(source_name, target_name, start, stop, kernel):
+    """
+    Worker for convolve_parallel: convolves samples start through stop - 1
+    of the shared source buffer, writes the first stop - start values of the
+    result into the shared target buffer and returns the rest.
+    """
+    source = shared_memory.SharedMemory(name=source_name)
+    target = shared_memory.SharedMemory(name=target_name)
+    samples = source.buf.cast("d")
+    output = target.buf.cast("d")
+    try:
+        result = convolve({"rate": 0, "samples": samples[start:stop]}, kernel)
+        result = result["samples"]
+        output[start:stop] = result[:stop - start]
+        return result[stop - start:]
+    finally:
+        samples.release()
+        output.release()
+        source.close()
+        target.close()
+
+def echo(sound, num_echoes, delay, scale, feedback=False):
     """
     Apply echo effect to given sound by adding one 
     or more additional copies to the sound, each delayed
     and scaled down to corresponding amounts.
-    
+
+    Each copy is added into the output as one slice.  With feedback=True (and
+    abs(scale) <= 1) the same output is instead computed in a single pass by
+    the recursion
+
+        y[n] = x[n] + scale * y[n - d]
+                    - scale**(num_echoes + 1) * x[n - (num_echoes + 1) * d]
+
+    where d is the delay in samples and the last term cancels the echoes past
+    num_echoes, so the cost no longer grows with num_echoes.  Louder scales
+    use the slices even with feedback=True, since scale**(num_echoes + 1)
+    would swamp the cancellation, or overflow.
     """
+    samples = sound["samples"]
     sample_delay = round(delay * sound["rate"])
-    echo_filter_length = (sample_delay * num_echoes) + len(sound["samples"])
-    # initialize echo filter with zeros
-    echo_filter = [0] * echo_filter_length
+    echo_filter = _zeros(len(samples) + sample_delay * num_echoes)
 
-    # copy original sound samples to echo_filter
-    for i in range(len(sound["samples"])):
-        echo_filter[i] = sound["samples"][i]
+    if sample_delay == 0:
+        # every copy lands on the original, so only the total gain matters
+        gain = total = 1
+        for _ in range(num_echoes):
+            gain *= scale
+            total += gain
+        _add_into(echo_filter, samples, total)
+    elif feedback and abs(scale) <= 1:
+        _echo_feedback(echo_filter, samples, num_echoes, sample_delay, scale)
+    else:
+        gain = 1
+        for i in range(num_echoes + 1):
+            _add_into(echo_filter, samples, gain, i * sample_delay)
+            gain *= scale
 
-    # add delayed and scaled copies to echo_filter
-    for i in range(1, num_echoes + 1):
-        offset = i * sample_delay
-        # iterate through original sound's samples
-        for j in range(len(sound["samples"])):
-            # prevent out of bounds indexing
-            if j + offset < echo_filter_length:
-                echo_filter[j + offset] += scale**i * sound["samples"][j]
+    return Sound(rate=sound["rate"], samples=echo_filter)
 
-    return {"rate": sound["rate"], "samples": echo_filter}
+def _echo_feedback(out, samples, num_echoes, sample_delay, scale):
+    """
+    Fills out with the echoed samples using the feedback recursion from echo,
+    one sample_delay-long block at a time.
+    """
+    span = (num_echoes + 1) * sample_delay
+    cutoff = scale ** (num_echoes + 1)
+    out[:len(samples)] = _as_array(samples)
+    for start in range(sample_delay, len(out), sample_delay):
+        stop = start + sample_delay
+        # the previous block is already final, so feed it back in
+        _add_into(out, out[start - sample_delay:stop - sample_delay], scale, start)
+        if start >= span:
+            _add_into(out, samples[start - span:stop - span], -cutoff, start)
 
-def pan(sound):
+def pan(sound, inplace=False):
     """
     Adjust sounds for left and right channels to achieve a panned
     effect.
+
+    A multichannel sound is panned across its channels in order: the sound
+    moves linearly from the first channel to the last, and each channel's
+    gain falls off linearly with the distance from that position.
+
+    With inplace=True the sound's own buffers are scaled, a block at a time,
+    and the sound itself is returned.
+    """
+    if "interleaved" in sound:
+        return _pan_interleaved(sound, inplace)
+
+    # left channel fades out while right channel fades in
+    left_last = len(sound["left"]) - 1
+    right_last = len(sound["right"]) - 1
+
+    def fade_out(values, start):
+        return array(
+            "d", [(1 - i / left_last) * v for i, v in enumerate(values, start)]
+        )
+
+    def fade_in(values, start):
+        return array(
+            "d", [i / right_last * v for i, v in enumerate(values, start)]
+        )
+
+    if not inplace:
+        sound = Sound(
+            rate=sound["rate"],
+            left=array("d", sound["left"]),
+            right=array("d", sound["right"]),
+        )
+    _map_blocks(sound["left"], fade_out)
+    _map_blocks(sound["right"], fade_in)
+    return sound
+
+def _pan_interleaved(sound, inplace=False):
     """
-    # calculate scaling for left and right sounds
-    left_scale = [1 - i / (len(sound["left"]) - 1) for i in range(len(sound["left"]))]
-    right_scale = [i / (len(sound["right"]) - 1) for i in range(len(sound["right"]))]
+    pan for multichannel sounds, which for two channels matches stereo pan.
+    """
+    channels = sound["channels"]
+    last = len(sound["interleaved"]) // channels - 1
+    if inplace:
+        panned = sound["interleaved"]
+    else:
+        panned = array("d", sound["interleaved"])
+    for channel in range(channels):
 
-    # apply scaling to left and right channels
-    left_channel = [left_scale[i] * sound["left"][i] for i in range(len(left_scale))]
-    right_channel = [right_scale[i] * sound["right"][i]
-                    for i in range(len(right_scale))]
+        def gain(values, start):
+            return array("d", [
+                max(0, 1 - abs(i * (channels - 1) / last - channel)) * v
+                for i, v in enumerate(values, start)
+            ])
 
-    return {"rate": sound["rate"], "left": left_channel, "right": right_channel}
+        _map_blocks(panned, gain, channel, channels)
+    if inplace:
+        return sound
+    return Sound(rate=sound["rate"], channels=channels, interleaved=panned)
 
 
-def remove_vocals(sound):
+def remove_vocals(sound, inplace=False):
     """
     Create mono output sound from stereo input sound.
+
+    For multichannel sounds the first two channels (front left and front
+    right in WAV channel order) are used.
+
+    With inplace=True the result is written over the sound's left channel
+    (or the front of its interleaved buffer, which is then truncated), and
+    the sound itself is turned into the mono result and returned.
     """
+    if inplace:
+        return _remove_vocals_inplace(sound)
+    if "interleaved" in sound:
+        channels = sound["channels"]
+        data = memoryview(_as_array(sound["interleaved"]))
+        left, right = data[0::channels], data[1::channels]
+    else:
+        left, right = sound["left"], sound["right"]
     # subtract right from left sound to compute stereo
-    mono = [sound["left"][i] - sound["right"][i] for i in range(len(sound["left"]))]
-    return {"rate": sound["rate"], "samples": mono}
+    length = min(len(left), len(right))
+    mono = _zeros(length)
+    for start in range(0, length, WAV_CHUNK_FRAMES):
+        stop = min(start + WAV_CHUNK_FRAMES, length)
+        mono[start:stop] = array("d", [
+            l - r for l, r in zip(left[start:stop], right[start:stop])
+        ])
+    return Sound(rate=sound["rate"], samples=mono)
+
+def _remove_vocals_inplace(sound):
+    """
+    remove_vocals for sounds that own their buffers.
+    """
+    if "interleaved" in sound:
+        channels = sound["channels"]
+        data = sound["interleaved"]
+        length = len(data) // channels
+        # frame i is written to index i, which is never ahead of the frames
+        # still to be read
+        for start in range(0, length, WAV_CHUNK_FRAMES):
+            stop = min(start + WAV_CHUNK_FRAMES, length)
+            data[start:stop] = array("d", [
+                l - r for l, r in zip(
+                    data[start * channels:stop * channels:channels],
+                    data[start * channels + 1:stop * channels:channels],
+                )
+            ])
+        del data[length:]
+        del sound["interleaved"], sound["channels"]
+    else:
+        data, right = sound.pop("left"), sound.pop("right")
+        _map_blocks(data, lambda values, start: array("d", [
+            l - r for l, r in zip(values, right[start:start + len(values)])
+        ]))
+    sound["samples"] = data
+    return sound
+
+def resample(sound, rate, taps=RESAMPLE_TAPS):
+    """
+    Converts a sound (mono, stereo or multichannel) to a new sampling rate.
+
+    This is a rational polyphase resampler: conceptually the sound is
+    upsampled by L, low-pass filtered with a windowed-sinc filter and
+    downsampled by M, where L/M is the ratio of the rates in lowest terms,
+    but only the taps-long branch of the filter that lands on each output
+    sample is ever evaluated.  Filter tables are cached per ratio.
+    """
+    if rate == sound["rate"]:
+        return Sound(sound).copy()
+
+    if "interleaved" in sound:
+        channels = sound["channels"]
+        data = memoryview(_as_array(sound["interleaved"]))
+        converted = [
+            _resample_samples(data[c::channels], sound["rate"], rate, taps)
+            for c in range(channels)
+        ]
+        interleaved = _zeros(channels * len(converted[0]))
+        for c, samples in enumerate(converted):
+            interleaved[c::channels] = samples
+        return Sound(rate=rate, channels=channels, interleaved=interleaved)
+
+    out = Sound(rate=rate)
+    for name in _channel_names(sound):
+        out[name] = _resample_samples(sound[name], sound["rate"], rate, taps)
+    return out
+
+def _resample_samples(samples, old_rate, new_rate, taps):
+    """
+    Resamples a single channel in one go.
+    """
+    resampler = _Resampler(old_rate, new_rate, taps)
+    out = resampler.feed(samples)
+    out.extend(resampler.flush())
+    return out
+
+class _Resampler:
+    """
+    Polyphase resampling state for one channel, so that a channel can be
+    converted a chunk at a time: feed() returns every output sample that the
+    input seen so far determines, and flush() the rest once input ends.
+
+    Output sample m is centred on upsampled position u = m*M + center, and
+    is the dot product of filter branch u % L with the taps input samples
+    ending at u // L.  The input starts with taps zeros of padding.
+    """
+
+    def __init__(self, old_rate, new_rate, taps):
+        common = math.gcd(old_rate, new_rate)
+        self.up, self.down = new_rate // common, old_rate // common
+        self.taps = taps
+        self.table = _polyphase_table(self.up, self.down, taps)
+        self.center = taps * self.up // 2
+        self.history = _zeros(taps)
+        self.first = -taps  # input index of history[0]
+        self.count = 0  # input samples fed so far
+        self.produced = 0  # output samples returned so far
+
+    def feed(self, samples):
+        """
+        Adds input samples, returning the output samples now available.
+        """
+        self.history.extend(samples)
+        self.count += len(samples)
+        last = self.first + len(self.history) - 1
+        return self._run(((last + 1) * self.up - 1 - self.center) // self.down + 1)
+
+    def flush(self):
+        """
+        Ends the input, returning the remaining output samples.
+        """
+        self.history.extend(_zeros(self.taps))
+        return self._run(-(-self.count * self.up // self.down))
+
+    def _run(self, stop):
+        """
+        Computes output samples self.produced through stop - 1.
+        """
+        up, down, taps, center = self.up, self.down, self.taps, self.center
+        table, history, first = self.table, self.history, self.first
+        out = array("d")
+        for m in range(self.produced, stop):
+            position = m * down + center
+            end = position // up - first + 1
+            out.append(sum([
+                h * x for h, x in zip(table[position % up], history[end - taps:end])
+            ]))
+        self.produced = max(self.produced, stop)
+
+        # forget the input that no later output sample needs
+        needed = (self.produced * down + center) // up - taps + 1
+        if needed > self.first:
+            del self.history[:needed - self.first]
+            self.first = needed
+        return out
+
+@functools.lru_cache(maxsize=16)
+def _polyphase_table(up, down, taps):
+    """
+    Splits a Blackman-windowed sinc low-pass filter, with its cutoff at the
+    lower of the two Nyquist frequencies, into up branches of taps
+    coefficients each.  Each branch is reversed, to line up with the input
+    samples it multiplies in ascending order, and normalized to unit gain
+    at DC.
+    """
+    length = taps * up
+    center = length // 2
+    cutoff = 0.5 / max(up, down)  # in cycles per upsampled sample
+    prototype = []
+    for n in range(length):
+        t = n - center
+        if t == 0:
+            sinc = 2 * cutoff
+        else:
+            sinc = math.sin(2 * math.pi * cutoff * t) / (math.pi * t)
+        window = (0.42 + 0.5 * math.cos(2 * math.pi * t / length)
+                  + 0.08 * math.cos(4 * math.pi * t / length))
+        prototype.append(sinc * window)
+
+    table = []
+    for phase in range(up):
+        branch = [prototype[phase + j * up] for j in reversed(range(taps))]
+        total = sum(branch)
+        table.append(tuple(h / total for h in branch) if total else tuple(branch))
+    return tuple(table)
 
-def bass_boost_kernel(n_val, scale=0):
+def bass_boost_kernel(n_val, scale=0, cache_dir=None):
     """
     Construct a kernel that acts as a bass-boost filter.
 
@@ -128,96 +744,649 @@ def bass_boost_kernel(n_val, scale=0):
     (1/2 + 1/2cos(Omega)) ^ n_val
 
     Then we scale that piece up and add a copy of the original signal back in.
+
+    Kernels are memoized on (n_val, scale), and when cache_dir (or the module's
+    KERNEL_CACHE_DIR) is set they are also saved there for later processes to
+    reuse.  Each call returns a new list, so callers are free to modify it.
+    """
+    return _bass_boost_kernel(n_val, scale, cache_dir or KERNEL_CACHE_DIR).tolist()
+
+@functools.lru_cache(maxsize=32)
+def _bass_boost_kernel(n_val, scale, cache_dir):
     """
-    # make this a fake "sound" so that we can use the convolve function
-    base = {"rate": 0, "samples": [0.25, 0.5, 0.25]}
-    kernel = {"rate": 0, "samples": [0.25, 0.5, 0.25]}
-    for i in range(n_val):
-        kernel = convolve(kernel, base["samples"])
-    kernel = kernel["samples"]
-
-    # at this point, the kernel will be acting as a low-pass filter, so we
-    # scale up the values by the given scale, and add in a value in the middle
-    # to get a (delayed) copy of the original
-    kernel = [i * scale for i in kernel]
+    Builds (or loads from cache_dir) the bass-boost kernel as an array('d').
+    The result is shared between callers and must not be modified.
+    """
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"bass_boost_{n_val}_{scale!r}.kernel")
+        try:
+            with open(path, "rb") as file:
+                return _decode_doubles(file.read())
+        except FileNotFoundError:
+            pass
+
+    # (1/4, 1/2, 1/4) convolved with itself n_val times is ((1 + z) / 2)^(2m)
+    # with m = n_val + 1, so the low-pass taps are C(2m, j) / 4^m
+    half = max(n_val, 0) + 1
+    denominator = 4**half
+    kernel = array("d")
+    coefficient = 1
+    for j in range(2 * half + 1):
+        kernel.append(coefficient / denominator * scale)
+        coefficient = coefficient * (2 * half - j) // (j + 1)
+
+    # at this point, the kernel will be acting as a scaled-up low-pass
+    # filter, so we add in a value in the middle to get a (delayed) copy of
+    # the original
     kernel[len(kernel) // 2] += 1
 
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        # write to a private file first so concurrent processes never see
+        # a partial kernel
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as file:
+            file.write(_encode_doubles(kernel))
+        os.replace(partial, path)
     return kernel
 
+def _encode_doubles(values):
+    """
+    Returns an array('d') as little-endian bytes.
+    """
+    if sys.byteorder == "big":
+        values = values[:]
+        values.byteswap()
+    return values.tobytes()
+
+def _decode_doubles(data):
+    """
+    Decodes little-endian bytes into an array('d').
+    """
+    values = array("d")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
 
 # below are helper functions for converting back-and-forth between WAV files
 # and our internal dictionary representation for sounds
 
 
-def load_wav(filename, stereo=False):
+def load_wav(filename, stereo=False, multichannel=False):
     """
     Given the filename of a WAV file, load the data from that file and return a
-    Python dictionary representing that sound
+    Sound (a Python dictionary) representing that sound
+
+    8-bit unsigned, 16-, 24- and 32-bit integer and 32- and 64-bit IEEE float
+    files are supported; integer samples are scaled to [-1, 1).
+
+    With multichannel=True the file is loaded with all of its channels, as
+    an interleaved Sound.  Otherwise files with more than two channels are
+    averaged down to mono, or keep their first two channels for stereo.
+
+    Frames are read WAV_CHUNK_FRAMES at a time and decoded in bulk.
     """
-    file = wave.open(filename, "r")
-    chan, bd, sr, count, _, _ = file.getparams()
+    with WavMap(filename) as wav:
+        if multichannel:
+            out = Sound(rate=wav.rate, channels=wav.channels, interleaved=[])
+        elif stereo:
+            out = Sound(rate=wav.rate, left=[], right=[])
+        else:
+            out = Sound(rate=wav.rate, samples=[])
+        for chunk in _read_chunks(wav, stereo, multichannel, WAV_CHUNK_FRAMES):
+            for name in _channel_names(out):
+                out[name].extend(chunk[name])
+    return out
 
-    assert bd == 2, "only 16-bit WAV files are supported"
 
-    out = {"rate": sr}
+def load_wav_chunks(filename, stereo=False, chunk_frames=None,
+                    multichannel=False):
+    """
+    Generator version of load_wav: yields the WAV file as a sequence of
+    Sounds of at most chunk_frames frames each (WAV_CHUNK_FRAMES by default),
+    so that only one chunk has to be in memory at a time.
+    """
+    with WavMap(filename) as wav:
+        yield from _read_chunks(
+            wav, stereo, multichannel, chunk_frames or WAV_CHUNK_FRAMES
+        )
 
-    if stereo:
-        left = []
-        right = []
-        for i in range(count):
-            frame = file.readframes(1)
-            if chan == 2:
-                left.append(struct.unpack("<h", frame[:2])[0])
-                right.append(struct.unpack("<h", frame[2:])[0])
-            else:
-                datum = struct.unpack("<h", frame)[0]
-                left.append(datum)
-                right.append(datum)
 
-        out["left"] = [i / (2**15) for i in left]
-        out["right"] = [i / (2**15) for i in right]
+def _read_chunks(wav, stereo, multichannel, chunk_frames):
+    """
+    Decodes an open WavMap, chunk_frames frames at a time.
+    """
+    for start in range(0, len(wav), chunk_frames):
+        yield wav.read(start, start + chunk_frames, stereo, multichannel)
+
+
+def _frames_to_sound(samples, chan, rate, stereo, multichannel=False):
+    """
+    Converts interleaved samples into a mono, stereo or multichannel Sound.
+    """
+    if multichannel:
+        return Sound(rate=rate, channels=chan, interleaved=samples)
+
+    if chan >= 2:
+        # deinterleave the first two channels
+        left, right = samples[0::chan], samples[1::chan]
     else:
-        samples = []
-        for i in range(count):
-            frame = file.readframes(1)
-            if chan == 2:
-                left = struct.unpack("<h", frame[:2])[0]
-                right = struct.unpack("<h", frame[2:])[0]
-                samples.append((left + right) / 2)
-            else:
-                datum = struct.unpack("<h", frame)[0]
-                samples.append(datum)
+        left = right = samples
+
+    if stereo:
+        return Sound(rate=rate, left=left, right=right[:])
+    if chan == 2:
+        return Sound(rate=rate, samples=[(l + r) / 2 for l, r in zip(left, right)])
+    if chan > 2:
+        frames = zip(*(samples[c::chan] for c in range(chan)))
+        return Sound(rate=rate, samples=[sum(f) / chan for f in frames])
+    return Sound(rate=rate, samples=samples)
 
-        out["samples"] = [i / (2**15) for i in samples]
 
-    return out
+class WavMap:
+    """
+    Read-only, memory-mapped view of a WAV file.
+
+    The RIFF header is parsed directly and the sample data is exposed as
+    data, a memoryview of the mapped file, and (except for 24-bit files) as
+    pcm, the same memory cast to the samples' native type (interleaved if
+    there are several channels).  Opening a file is O(1) whatever its
+    length, and read() decodes only the requested range of frames.
+    """
+
+    def __init__(self, filename):
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            fmt, offset, size = _parse_riff(self._map)
+            tag, self.channels, self.rate, _, _, bits = fmt
+            self.sample_format = _FORMAT_NAMES.get((tag, bits))
+            if self.sample_format is None:
+                raise ValueError(
+                    f"unsupported WAV sample format (tag {tag}, {bits}-bit)"
+                )
+        except (ValueError, OSError, struct.error):
+            self.close()
+            raise
+        self._frame_bytes = self.channels * bits // 8
+        size -= size % self._frame_bytes
+        self.data = memoryview(self._map)[offset:offset + size]
+        typecode = _SAMPLE_CODES.get(self.sample_format, (None,))[0]
+        self.pcm = self.data.cast(typecode) if typecode else None
+
+    def __len__(self):
+        """
+        Number of frames in the file.
+        """
+        return len(self.data) // self._frame_bytes
+
+    def read(self, start=0, stop=None, stereo=False, multichannel=False):
+        """
+        Decodes frames start through stop - 1 (clipped to the file, like a
+        slice) and returns them as a Sound, as load_wav would.
+        """
+        start, stop, _ = slice(start, stop).indices(len(self))
+        window = self.data[start * self._frame_bytes:
+                           max(start, stop) * self._frame_bytes]
+        samples = _decode_samples(window, self.sample_format)
+        return _frames_to_sound(
+            samples, self.channels, self.rate, stereo, multichannel
+        )
+
+    def close(self):
+        """
+        Releases the mapping and closes the file.
+        """
+        for view in ("pcm", "data"):
+            if getattr(self, view, None) is not None:
+                getattr(self, view).release()
+                setattr(self, view, None)
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _parse_riff(data):
+    """
+    Walks the chunks of a RIFF/WAVE file held in the bytes-like data.
 
-def write_wav(sound, filename):
+    Returns (format, offset, size) where format is the (format tag, channels,
+    rate, byte rate, block align, bits per sample) tuple from the fmt chunk,
+    and offset and size locate the sample data.  For WAVE_FORMAT_EXTENSIBLE
+    files the format tag is taken from the sub-format.
+    """
+    if data[0:4] != b"RIFF" or data[8:12] != b"WAVE":
+        raise ValueError("not a RIFF/WAVE file")
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        (size,) = struct.unpack_from("<I", data, pos + 4)
+        body = pos + 8
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", data, body)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                fmt = struct.unpack_from("<H", data, body + 24) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise ValueError("WAV data chunk comes before its fmt chunk")
+            return fmt, body, min(size, len(data) - body)
+        # chunks are padded to an even number of bytes
+        pos = body + size + (size & 1)
+    raise ValueError("WAV file has no data chunk")
+
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# WAV sample formats: name -> (format tag, bits per sample)
+SAMPLE_FORMATS = {
+    "uint8": (_WAVE_FORMAT_PCM, 8),
+    "int16": (_WAVE_FORMAT_PCM, 16),
+    "int24": (_WAVE_FORMAT_PCM, 24),
+    "int32": (_WAVE_FORMAT_PCM, 32),
+    "float32": (_WAVE_FORMAT_IEEE_FLOAT, 32),
+    "float64": (_WAVE_FORMAT_IEEE_FLOAT, 64),
+}
+_FORMAT_NAMES = {value: name for name, value in SAMPLE_FORMATS.items()}
+
+# array typecode, full scale and zero offset of each natively typed format
+_SAMPLE_CODES = {
+    "uint8": ("B", 2**7, 2**7),
+    "int16": ("h", 2**15, 0),
+    "int32": ("i", 2**31, 0),
+    "float32": ("f", 1, 0),
+    "float64": ("d", 1, 0),
+}
+
+
+def _decode_samples(data, sample_format):
+    """
+    Decodes little-endian WAV sample bytes into an array('d'), scaling
+    integer samples to [-1, 1).
+    """
+    if sample_format == "int24":
+        # widen to 32 bits by putting each 3-byte sample in the top bytes
+        data = bytes(data)
+        widened = bytearray(len(data) // 3 * 4)
+        for byte in range(3):
+            widened[byte + 1::4] = data[byte::3]
+        data, sample_format = widened, "int32"
+
+    typecode, scale, offset = _SAMPLE_CODES[sample_format]
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big" and values.itemsize > 1:
+        values.byteswap()
+    if typecode in "fd":
+        return _as_array(values)
+    if offset:
+        return array("d", [(v - offset) / scale for v in values])
+    return array("d", [v / scale for v in values])
+
+
+def write_wav(sound, filename, sample_format="int16"):
     """
     Given a dictionary representing a sound, and a filename, convert the given
     sound into WAV format and save it as a file with the given filename (which
     can then be opened by most audio players)
+
+    sample_format is one of the SAMPLE_FORMATS: 16-bit integer by default,
+    or "uint8", "int24", "int32", "float32" or "float64".  Integer formats
+    clip samples to [-1, 1].
+
+    Samples are quantized, interleaved and written WAV_CHUNK_FRAMES frames at
+    a time.
     """
-    outfile = wave.open(filename, "w")
+    write_wav_chunks([sound], filename, sample_format)
 
-    if "samples" in sound:
-        # mono file
-        outfile.setparams((1, 2, sound["rate"], 0, "NONE", "not compressed"))
-        out = [int(max(-1, min(1, v)) * (2**15 - 1)) for v in sound["samples"]]
+
+def write_wav_chunks(chunks, filename, sample_format="int16"):
+    """
+    Streaming version of write_wav: writes an iterable of Sounds (such as the
+    output of load_wav_chunks or the stream_* effects) to a single WAV file,
+    encoding each chunk as it arrives.  The rate and channel layout are taken
+    from the first chunk.
+    """
+    tag, bits = SAMPLE_FORMATS[sample_format]
+    outfile = None
+    try:
+        for chunk in chunks:
+            if "interleaved" in chunk:
+                # already interleaved: encode it as a single run of samples
+                count = stride = chunk["channels"]
+                channels = [chunk["interleaved"]]
+            else:
+                channels = [chunk[name] for name in _channel_names(chunk)]
+                count, stride = len(channels), 1
+            if outfile is None:
+                outfile = open(filename, "wb")
+                outfile.write(_wav_header(tag, count, chunk["rate"], bits, 0))
+            length = min(len(channel) for channel in channels) // stride
+            for start in range(0, length, WAV_CHUNK_FRAMES):
+                stop = min(start + WAV_CHUNK_FRAMES, length)
+                outfile.write(_encode_samples(
+                    [c[start * stride:stop * stride] for c in channels],
+                    sample_format,
+                ))
+        if outfile is not None:
+            # now that the length is known, fill in the chunk sizes
+            size = outfile.tell() - _WAV_HEADER_SIZE
+            if size & 1:
+                outfile.write(b"\0")
+            outfile.seek(0)
+            outfile.write(_wav_header(tag, count, chunk["rate"], bits, size))
+    finally:
+        if outfile is not None:
+            outfile.close()
+    if outfile is None:
+        raise ValueError("no chunks to write")
+
+
+_WAV_HEADER_SIZE = 44
+
+
+def _wav_header(tag, channels, rate, bits, size):
+    """
+    Returns the 44-byte RIFF header for size bytes of sample data.
+    """
+    block = channels * bits // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + size + (size & 1), b"WAVE",
+        b"fmt ", 16, tag, channels, rate, rate * block, block, bits,
+        b"data", size,
+    )
+
+
+def _encode_samples(channels, sample_format):
+    """
+    Encodes equal-length channel buffers in the given sample format and
+    returns the interleaved little-endian bytes.  Integer formats clip to
+    [-1, 1] before quantizing.
+    """
+    count = len(channels)
+    if sample_format in ("float32", "float64"):
+        typecode = _SAMPLE_CODES[sample_format][0]
+        encoded = [array(typecode, channel) for channel in channels]
     else:
-        # stereo
-        outfile.setparams((2, 2, sound["rate"], 0, "NONE", "not compressed"))
-        out = []
-        for left, right in zip(sound["left"], sound["right"]):
-            left = int(max(-1, min(1, left)) * (2**15 - 1))
-            right = int(max(-1, min(1, right)) * (2**15 - 1))
-            out.append(left)
-            out.append(right)
-
-    outfile.writeframes(b"".join(struct.pack("<h", frame) for frame in out))
-    outfile.close()
+        bits = SAMPLE_FORMATS[sample_format][1]
+        full = 2 ** (bits - 1) - 1
+        offset = 2**7 if sample_format == "uint8" else 0
+        typecode = "B" if sample_format == "uint8" else "h" if bits == 16 else "i"
+        encoded = [
+            array(typecode, [
+                (int(v * full) if -1 <= v <= 1 else -full if v < -1 else full)
+                + offset
+                for v in channel
+            ])
+            for channel in channels
+        ]
+
+    if count == 1:
+        out = encoded[0]
+    else:
+        out = array(typecode, bytes(encoded[0].itemsize * count * len(encoded[0])))
+        for index, values in enumerate(encoded):
+            out[index::count] = values
+    if sys.byteorder == "big" and out.itemsize > 1:
+        out = out[:]
+        out.byteswap()
+
+    if sample_format == "int24":
+        # keep the low three bytes of each little-endian 32-bit sample
+        wide = out.tobytes()
+        packed = bytearray(len(wide) // 4 * 3)
+        for byte in range(3):
+            packed[byte::3] = wide[byte::4]
+        return bytes(packed)
+    return out.tobytes()
+
+
+# below are streaming versions of the effects.  each one takes an iterable of
+# Sound chunks (as produced by load_wav_chunks) and lazily yields the chunks
+# of the result, carrying whatever state it needs from one chunk to the next,
+# so arbitrarily long recordings can be processed in constant memory.
+
+
+def stream_mix(chunks1, chunks2, p):
+    """
+    Streaming version of mix: yields the chunks of p times the first stream
+    plus 1-p times the second.  Both streams must have the same sampling rate
+    and channel layout, but their chunks need not line up.
+    """
+    iter1, iter2 = iter(chunks1), iter(chunks2)
+    head1 = head2 = None
+    while True:
+        if head1 is None:
+            head1 = _next_chunk(iter1)
+        if head2 is None:
+            head2 = _next_chunk(iter2)
+        if head1 is None and head2 is None:
+            return
+        if head1 is not None and head2 is not None:
+            if head1["rate"] != head2["rate"]:
+                raise ValueError("cannot mix streams with different rates")
+            if (_channel_names(head1) != _channel_names(head2)
+                    or _layout(head1) != _layout(head2)):
+                raise ValueError("cannot mix streams with different channels")
+            length = min(_length(head1), _length(head2))
+        else:
+            length = _length(head1 if head1 is not None else head2)
+
+        first = head1 if head1 is not None else head2
+        out = Sound(rate=first["rate"], **_layout(first))
+        names = _channel_names(first)
+        # interleaved buffers hold several samples per frame
+        count = length * _stride(first)
+        for name in names:
+            out[name] = _zeros(count)
+        for head, gain in ((head1, p), (head2, 1 - p)):
+            if head is not None:
+                for name in names:
+                    _add_into(out[name], head[name][:count], gain)
+        yield out
+
+        head1 = _drop(head1, length)
+        head2 = _drop(head2, length)
+
+
+def stream_echo(chunks, num_echoes, delay, scale):
+    """
+    Streaming version of echo.  The delayed copies that spill past the end of
+    a chunk are carried over into the following ones, and are flushed as a
+    final chunk once the input runs out.
+    """
+    carry = None
+    for chunk in chunks:
+        stride = _stride(chunk)
+        # delays and lengths in samples, which for interleaved chunks is
+        # frames times channels
+        sample_delay = round(delay * chunk["rate"]) * stride
+        tail = sample_delay * num_echoes
+        length = _length(chunk) * stride
+        if carry is None:
+            carry = {name: _zeros(tail) for name in _channel_names(chunk)}
+
+        out = Sound(rate=chunk["rate"], **_layout(chunk))
+        for name in _channel_names(chunk):
+            acc = _zeros(length + tail)
+            acc[:tail] = carry[name]
+            gain = 1
+            for i in range(num_echoes + 1):
+                _add_into(acc, chunk[name], gain, i * sample_delay)
+                gain *= scale
+            out[name] = acc[:length]
+            carry[name] = acc[length:]
+        yield out
+
+    if carry is not None:
+        yield Sound(rate=chunk["rate"], **_layout(chunk), **carry)
+
+
+def stream_convolve(chunks, kernel):
+    """
+    Streaming version of convolve.  Each chunk is convolved on its own and
+    the last len(kernel) - 1 samples of the running result are carried into
+    the next chunk (overlap-add), then flushed once the input runs out.
+    The channels of interleaved chunks are convolved separately.
+    """
+    carry = None
+    for chunk in chunks:
+        length = _length(chunk)
+        channels = _split(chunk)
+        if carry is None:
+            carry = [array("d") for _ in channels]
+
+        results = []
+        for index, samples in enumerate(channels):
+            acc = convolve({"rate": chunk["rate"], "samples": samples},
+                           kernel)["samples"]
+            _add_into(acc, carry[index])
+            results.append(acc[:length])
+            carry[index] = acc[length:]
+        yield _joined(chunk, results)
+
+    if carry is not None:
+        yield _joined(chunk, carry)
+
+
+def stream_pan(chunks, length, start=0):
+    """
+    Streaming version of pan.  Since the fade depends on the position in the
+    whole sound, the total number of frames must be given up front, along
+    with the frame the first chunk starts at if that is not the beginning.
+    """
+    position = start
+    last = length - 1
+    for chunk in chunks:
+        if "interleaved" in chunk:
+            channels = chunk["channels"]
+            panned = [
+                array("d", [
+                    max(0, 1 - abs((position + i) * (channels - 1) / last - c)) * v
+                    for i, v in enumerate(samples)
+                ])
+                for c, samples in enumerate(_split(chunk))
+            ]
+            position += _length(chunk)
+            yield _joined(chunk, panned)
+            continue
+        left = array("d", [
+            (1 - (position + i) / last) * v for i, v in enumerate(chunk["left"])
+        ])
+        right = array("d", [
+            (position + i) / last * v for i, v in enumerate(chunk["right"])
+        ])
+        position += len(left)
+        yield Sound(rate=chunk["rate"], left=left, right=right)
+
 
+def stream_resample(chunks, rate, taps=RESAMPLE_TAPS):
+    """
+    Streaming version of resample.  Each input chunk yields the output
+    samples it completes; the filter's look-ahead is flushed as a final
+    chunk once the input runs out.
+    """
+    resamplers = None
+    for chunk in chunks:
+        channels = _split(chunk)
+        if resamplers is None:
+            resamplers = [_Resampler(chunk["rate"], rate, taps) for _ in channels]
+        yield _joined(chunk, [
+            resampler.feed(samples)
+            for resampler, samples in zip(resamplers, channels)
+        ], rate)
+
+    if resamplers is not None:
+        yield _joined(
+            chunk, [resampler.flush() for resampler in resamplers], rate
+        )
+
+
+def stream_remove_vocals(chunks):
+    """
+    Streaming version of remove_vocals.
+    """
+    for chunk in chunks:
+        yield remove_vocals(chunk)
+
+
+def _layout(sound):
+    """
+    Returns the keys besides the rate and the channel buffers that describe
+    a sound's channels: {"channels": n} for interleaved sounds, else {}.
+    """
+    if "interleaved" in sound:
+        return {"channels": sound["channels"]}
+    return {}
+
+
+def _stride(sound):
+    """
+    Returns the number of samples per frame in each of a sound's buffers.
+    """
+    return sound["channels"] if "interleaved" in sound else 1
+
+
+def _split(sound):
+    """
+    Returns a sound's channels as separate buffers, deinterleaving them if
+    needed.
+    """
+    if "interleaved" in sound:
+        count = sound["channels"]
+        data = sound["interleaved"]
+        return [data[c::count] for c in range(count)]
+    return [sound[name] for name in _channel_names(sound)]
+
+
+def _joined(template, channels, rate=None):
+    """
+    Builds a Sound with the channel layout of template (and its rate, unless
+    another one is given) from separate channel buffers, as _split returns.
+    """
+    rate = template["rate"] if rate is None else rate
+    if "interleaved" in template:
+        count = template["channels"]
+        data = _zeros(count * min(len(c) for c in channels))
+        for index, samples in enumerate(channels):
+            data[index::count] = _as_array(samples[:len(data) // count])
+        return Sound(rate=rate, channels=count, interleaved=data)
+    return Sound(rate=rate, **dict(zip(_channel_names(template), channels)))
+
+
+def _next_chunk(chunks):
+    """
+    Returns the next nonempty chunk from an iterator, or None at the end.
+    """
+    for chunk in chunks:
+        if _length(chunk):
+            return chunk
+    return None
+
+
+def _drop(sound, count):
+    """
+    Returns sound without its first count frames, or None if nothing is left.
+    """
+    if sound is None or _length(sound) <= count:
+        return None
+    rest = Sound(rate=sound["rate"], **_layout(sound))
+    for name in _channel_names(sound):
+        rest[name] = sound[name][count * _stride(sound):]
+    return rest
 
 if __name__ == "__main__":
     # code in this block will only be run when you explicitly run your script,
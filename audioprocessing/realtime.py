@@ -0,0 +1,138 @@
+"""
+Block-at-a-time convolution for interactive use, such as reverb with long
+room impulse responses.
+
+    reverb = realtime.PartitionedConvolver(kernel, block_size=256)
+    for block in blocks:            # 256 samples each, as they arrive
+        play(reverb.process(block))
+
+The kernel (in the format bass_boost_kernel produces) is split into
+block_size partitions whose spectra are computed once.  Every block then
+costs one forward and one inverse FFT of twice the block size plus one
+multiply-accumulate per partition, however long the stream runs, and each
+output block is available as soon as its input block is: the latency is
+the block size.
+"""
+
+from array import array
+from collections import deque
+
+import lab
+
+
+class PartitionedConvolver:
+    """
+    Uniformly partitioned overlap-save convolution engine.
+
+    The spectra of the most recent input windows are kept in a frequency
+    domain delay line, newest first, so that the output block is the inverse
+    transform of sum(X[n - k] * H[k]) over the kernel partitions H[k].
+    """
+
+    def __init__(self, kernel, block_size=256):
+        if block_size < 1 or block_size & (block_size - 1):
+            raise ValueError("block_size must be a power of 2")
+        if not len(kernel):
+            raise ValueError("kernel must have at least one tap")
+        self.block_size = block_size
+        self.taps = len(kernel)
+        size = 2 * block_size
+        self._partitions = [
+            lab.fft(lab._padded(kernel[start:start + block_size], size))
+            for start in range(0, self.taps, block_size)
+        ]
+        self.reset()
+
+    @property
+    def latency(self):
+        """
+        Delay, in samples, between an input sample arriving and the output
+        it affects being available.
+        """
+        return self.block_size
+
+    def reset(self):
+        """
+        Clears the engine's history, as if no block had been processed yet.
+        """
+        size = 2 * self.block_size
+        self._window = [0.0] * size
+        self._delay = deque(
+            ([0j] * size for _ in self._partitions), maxlen=len(self._partitions)
+        )
+
+    def process(self, block):
+        """
+        Convolves the next block_size input samples, returning the next
+        block_size output samples as an array('d').
+        """
+        return array("d", [v.real for v in self._step(block)])
+
+    def process_stereo(self, left, right):
+        """
+        Like process, for two channels at once: since the kernel is real, the
+        left and right blocks travel through a single transform as the real
+        and imaginary parts of one complex signal.  Returns (left, right).
+        """
+        if len(left) != len(right):
+            raise ValueError("left and right blocks differ in length")
+        out = self._step([complex(l, r) for l, r in zip(left, right)])
+        return array("d", [v.real for v in out]), array("d", [v.imag for v in out])
+
+    def flush(self):
+        """
+        Returns the last len(kernel) - 1 output samples, which depend only on
+        blocks already processed, and resets the engine.
+        """
+        tail = array("d")
+        while len(tail) < self.taps - 1:
+            tail.extend(self.process([0.0] * self.block_size))
+        del tail[self.taps - 1:]
+        self.reset()
+        return tail
+
+    def _step(self, block):
+        """
+        Runs one block through the engine and returns the complex output.
+        """
+        size = self.block_size
+        if len(block) != size:
+            raise ValueError(f"expected a block of {size} samples, got {len(block)}")
+        # overlap-save: transform the previous block followed by this one
+        self._window = self._window[size:] + list(block)
+        self._delay.appendleft(lab.fft(self._window))
+
+        acc = [0j] * (2 * size)
+        for spectrum, partition in zip(self._delay, self._partitions):
+            acc = [a + x * h for a, x, h in zip(acc, spectrum, partition)]
+        # the first half of the result is wrapped around, the second is exact
+        return lab.fft(acc, inverse=True)[size:]
+
+
+def convolve(sound, kernel, block_size=256):
+    """
+    Runs a whole mono or stereo sound through a PartitionedConvolver, block
+    by block.  Each channel comes out as lab.convolve would give it.
+    """
+    engine = PartitionedConvolver(kernel, block_size)
+    names = lab._channel_names(sound)
+    if names == ("interleaved",):
+        raise ValueError("realtime.convolve needs a mono or stereo sound")
+    total = lab._length(sound) + engine.taps - 1
+    out = lab.Sound(rate=sound["rate"], **{name: [] for name in names})
+
+    # past the end of the sound, zero blocks push out the kernel's tail
+    for start in range(0, total, block_size):
+        blocks = [
+            lab._padded(sound[name][start:start + block_size], block_size)
+            for name in names
+        ]
+        if len(blocks) == 2:
+            results = engine.process_stereo(*blocks)
+        else:
+            results = [engine.process(blocks[0])]
+        for name, result in zip(names, results):
+            out[name].extend(result)
+    for name in names:
+        del out[name][total:]
+    return out
@@ -0,0 +1,192 @@
+"""
+Spectral analysis of sounds and kernels, on top of lab.fft (and so sharing
+its cached twiddle tables with convolve):
+
+    spec = spectral.spectrogram(lab.load_wav("test_outputs/hello_hpf.wav"))
+    freqs, response = spectral.frequency_response(lab.bass_boost_kernel(1000, 1.5))
+
+stft and spectrogram take whole Sounds; stream_stft takes a sequence of
+chunks, such as load_wav_chunks or a graph's blocks, so that long files can
+be analysed a frame at a time.
+"""
+
+import math
+import functools
+from array import array
+
+import lab
+
+# analysis windows, as functions of (index, size)
+WINDOWS = {
+    "rect": lambda i, n: 1.0,
+    "hann": lambda i, n: 0.5 - 0.5 * math.cos(2 * math.pi * i / n),
+    "hamming": lambda i, n: 0.54 - 0.46 * math.cos(2 * math.pi * i / n),
+    "blackman": lambda i, n: (
+        0.42 - 0.5 * math.cos(2 * math.pi * i / n)
+        + 0.08 * math.cos(4 * math.pi * i / n)
+    ),
+}
+
+# magnitudes below this are reported as this many dB by spectrogram(db=True)
+DB_FLOOR = -200
+
+
+def stft(sound, frame_size=1024, hop=None, window="hann"):
+    """
+    Short-time Fourier transform of a sound, mixed down to mono.
+
+    Frames of frame_size samples (a power of 2) start every hop samples
+    (frame_size // 4 by default, and at most frame_size), the last ones
+    zero-padded, and are multiplied by the named window.  Returns a list
+    with, for each frame, the frame_size // 2 + 1 complex bins from 0 Hz to
+    the Nyquist frequency.
+    """
+    return list(stream_stft([sound], frame_size, hop, window))
+
+
+def stream_stft(chunks, frame_size=1024, hop=None, window="hann"):
+    """
+    Streaming version of stft: yields the frames of a sequence of chunks,
+    holding only the current chunk and less than a frame of earlier samples.
+    """
+    hop = hop or frame_size // 4
+    if not 1 <= hop <= frame_size:
+        raise ValueError("hop must be between 1 and frame_size")
+    taper = _window(window, frame_size)
+    # buffer[offset:] holds the samples that frames have yet to start at;
+    # frames are sliced by index, and the buffer is only trimmed between
+    # chunks, so a long chunk is not shifted once per frame
+    buffer, pending, offset = [], [], 0
+    for chunk in chunks:
+        del buffer[:offset]
+        buffer.extend(_mono(chunk))
+        offset = 0
+        while len(buffer) - offset >= frame_size:
+            pending.append(buffer[offset:offset + frame_size])
+            offset += hop
+            if len(pending) == 2:
+                yield from _transform(pending, taper)
+                pending = []
+    # frames that start before the end of the sound but run past it
+    while offset < len(buffer):
+        pending.append(lab._padded(buffer[offset:offset + frame_size], frame_size))
+        offset += hop
+    for start in range(0, len(pending), 2):
+        yield from _transform(pending[start:start + 2], taper)
+
+
+def spectrogram(sound, frame_size=1024, hop=None, window="hann", db=False):
+    """
+    Magnitude spectrogram of a sound, mixed down to mono.
+
+    Returns a dictionary with the "frequencies" of the bins in Hz, the
+    "times" in seconds at which the frames start, and the "magnitudes", one
+    array('d') per frame (in dB relative to 1 if db is true).
+    """
+    hop = hop or frame_size // 4
+    magnitudes = [
+        _magnitudes(frame, db)
+        for frame in stream_stft([sound], frame_size, hop, window)
+    ]
+    rate = sound["rate"]
+    return {
+        "frequencies": bin_frequencies(frame_size, rate),
+        "times": [index * hop / rate for index in range(len(magnitudes))],
+        "magnitudes": magnitudes,
+    }
+
+
+def frequency_response(kernel, size=None, rate=1):
+    """
+    Frequency response of a convolution kernel, such as bass_boost_kernel
+    builds, evaluated at size // 2 + 1 evenly spaced frequencies (size is a
+    power of 2, by default the smallest one holding the kernel and at least
+    1024).  Returns (frequencies, response): frequencies are in Hz for the
+    given sampling rate (in cycles per sample by default) and response holds
+    the complex gains.
+    """
+    taps = len(kernel)
+    if size is None:
+        size = max(1024, 1 << (taps - 1).bit_length())
+    if size < taps:
+        raise ValueError("size must be at least the length of the kernel")
+    response = lab.fft(lab._padded(kernel, size))
+    return bin_frequencies(size, rate), response[:size // 2 + 1]
+
+
+def magnitude_response(kernel, size=None, rate=1, db=False):
+    """
+    Like frequency_response, with the magnitudes of the gains as an
+    array('d') (in dB if db is true).
+    """
+    frequencies, response = frequency_response(kernel, size, rate)
+    return frequencies, _magnitudes(response, db)
+
+
+def bin_frequencies(size, rate):
+    """
+    Returns the frequencies of the first size // 2 + 1 bins of a size-point
+    transform at the given sampling rate.
+    """
+    return [k * rate / size for k in range(size // 2 + 1)]
+
+
+@functools.lru_cache(maxsize=None)
+def _window(name, size):
+    """
+    Returns the named (periodic) window of the given size, cached.
+    """
+    if name not in WINDOWS:
+        raise ValueError(f"unknown window: {name!r}")
+    if size < 2 or size & (size - 1):
+        raise ValueError("frame_size must be a power of 2")
+    return tuple(WINDOWS[name](i, size) for i in range(size))
+
+
+def _transform(frames, taper):
+    """
+    Returns the non-negative frequency bins of one or two windowed frames.
+
+    Since the frames are real, two of them travel through a single transform
+    as the real and imaginary parts of one complex signal, and are separated
+    again using the symmetry of real spectra.
+    """
+    size = len(taper)
+    if len(frames) == 1:
+        spectrum = lab.fft([w * v for w, v in zip(taper, frames[0])])
+        return [spectrum[:size // 2 + 1]]
+
+    first, second = frames
+    spectrum = lab.fft([
+        complex(w * a, w * b) for w, a, b in zip(taper, first, second)
+    ])
+    mirrored = [spectrum[-k].conjugate() for k in range(size // 2 + 1)]
+    return [
+        [(z + m) / 2 for z, m in zip(spectrum, mirrored)],
+        [(z - m) * -0.5j for z, m in zip(spectrum, mirrored)],
+    ]
+
+
+def _mono(chunk):
+    """
+    Returns the samples of a chunk, averaging its channels if it has several.
+    """
+    if "samples" in chunk:
+        return chunk["samples"]
+    if "interleaved" in chunk:
+        count = chunk["channels"]
+        data = chunk["interleaved"]
+        return [sum(data[i:i + count]) / count for i in range(0, len(data), count)]
+    return [(l + r) / 2 for l, r in zip(chunk["left"], chunk["right"])]
+
+
+def _magnitudes(bins, db):
+    """
+    Returns the magnitudes of complex bins, in dB if db is true.
+    """
+    if not db:
+        return array("d", [abs(v) for v in bins])
+    return array("d", [
+        20 * math.log10(abs(v)) if abs(v) > 10 ** (DB_FLOOR / 20) else DB_FLOOR
+        for v in bins
+    ])
@@ -2,11 +2,20 @@
 
 import os
 import copy
+import math
+import wave
 import pickle
+import struct
 
 import pytest
 
 import lab
+import bench
+import batch
+import graph
+import instrument
+import realtime
+import spectral
 
 TEST_DIRECTORY = os.path.dirname(__file__)
 
@@ -84,6 +93,26 @@ def test_backwards_random(test_number):
     assert inps == inps2, "be careful not to modify the input!"
 
 
+def test_sound_is_array_backed():
+    snd = lab.Sound({"rate": 8, "samples": [1, 2, 3]})
+    assert isinstance(snd, dict)
+    assert snd["samples"].typecode == "d"
+    assert snd == {"rate": 8, "samples": lab.array("d", [1, 2, 3])}
+
+    snd["samples"] = [4, 5]
+    assert snd["samples"].typecode == "d"
+    assert snd.view("samples").tolist() == [4.0, 5.0]
+
+    dup = snd.copy()
+    dup["samples"][0] = 0
+    assert snd["samples"][0] == 4, "copy should not share buffers"
+
+    stereo = lab.pan({"rate": 8, "left": [1, 1, 1], "right": [1, 1, 1]})
+    assert isinstance(stereo, lab.Sound)
+    assert stereo["left"].typecode == stereo["right"].typecode == "d"
+    compare_sounds(lab.backwards(snd), {"rate": 8, "samples": [5, 4]})
+
+
 def test_mix_small():
     s1 = {
         "rate": 30,
@@ -137,6 +166,83 @@ def test_mix_random(test_number):
     assert inps == inps2, "be careful not to modify the inputs!"
 
 
+def test_mix_many():
+    s1 = {"rate": 30, "samples": [1, 2, 3, 4, 5, 6]}
+    s2 = {"rate": 30, "samples": [7, 8, 9, 10]}
+    s3 = {"rate": 30, "left": [1, 1], "right": [-1, -1, 2]}
+    inps = copy.deepcopy([s1, s2, s3])
+
+    compare_sounds(lab.mix_many([s1, s2], [0.7, 0.3]), lab.mix(s1, s2, 0.7))
+    compare_sounds(
+        lab.mix_many([s1, s2]),
+        {"rate": 30, "samples": [4, 5, 6, 7, 2.5, 3]},
+    )
+    compare_sounds(
+        lab.mix_many([s1, s2, s3], [1, 0.5, 2]),
+        {
+            "rate": 30,
+            "left": [6.5, 8, 7.5, 9, 5, 6],
+            "right": [2.5, 4, 11.5, 9, 5, 6],
+        },
+    )
+    assert [s1, s2, s3] == inps, "be careful not to modify the inputs!"
+
+    with pytest.raises(ValueError):
+        lab.mix_many([s1, {"rate": 20, "samples": [1]}])
+    with pytest.raises(ValueError):
+        lab.mix_many([s1, s2], [1])
+
+
+def tone(rate, length, freq=300):
+    return [math.sin(2 * math.pi * freq * i / rate) for i in range(length)]
+
+
+def test_resample():
+    inp = {"rate": 8000, "samples": tone(8000, 4000)}
+    inp2 = copy.deepcopy(inp)
+    for rate in (11025, 6000, 16000):
+        res = lab.resample(inp, rate)
+        assert res["rate"] == rate
+        exp = tone(rate, len(res["samples"]))
+        assert len(exp) == math.ceil(4000 * rate / 8000)
+        # away from the edges the resampled tone matches the ideal one
+        compare_sounds(
+            {"rate": rate, "samples": res["samples"][100:-100]},
+            {"rate": rate, "samples": exp[100:-100]},
+            eps=1e-3,
+        )
+        chunks = chunked(inp, [1, 333, 1000])
+        compare_sounds(joined(lab.stream_resample(chunks, rate)), res, eps=1e-12)
+    assert inp == inp2, "be careful not to modify the input!"
+
+    stereo = lab.resample(
+        {"rate": 8000, "left": inp["samples"], "right": [0] * 4000}, 12000
+    )
+    multi = lab.resample(
+        {"rate": 8000, "channels": 2,
+         "interleaved": [v for s in inp["samples"] for v in (s, 0)]},
+        12000,
+    )
+    assert list(stereo["left"]) == list(multi["interleaved"][0::2])
+    assert not any(stereo["right"])
+
+
+def test_mix_converts_rates():
+    s1 = {"rate": 16000, "samples": [0.5] * 320}
+    s2 = {"rate": 8000, "samples": [1.0] * 160}
+    assert lab.mix(s1, s2, 0.5) is None
+    res = lab.mix(s1, s2, 0.5, convert_rate=True)
+    assert res["rate"] == 16000 and len(res["samples"]) == 320
+    compare_sounds(
+        {"rate": 16000, "samples": res["samples"][40:-40]},
+        {"rate": 16000, "samples": [0.75] * 240},
+        eps=1e-3,
+    )
+    compare_sounds(lab.mix_many([s1, s2], [0.5, 0.5], rate=16000), res)
+    with pytest.raises(ValueError):
+        lab.mix_many([s1, s2])
+
+
 def test_convolve_small():
     inp = {
         "rate": 7,
@@ -180,6 +286,72 @@ def test_convolve_real():
     assert inp == inp2, "be careful not to modify the input!"
 
 
+@pytest.mark.parametrize("test_number", [1, 2, 3, 4])
+def test_convolve_fft_matches_direct(test_number):
+    inps, exp = load_pickle_pair("convolve_%02d.pickle" % test_number)
+    compare_sounds(lab.convolve(*inps, method="fft"), exp)
+    compare_sounds(lab.convolve(*inps, method="direct"), exp)
+
+
+def test_convolve_fft_long_kernel():
+    inp = {"rate": 8, "samples": [((7 * i) % 11 - 5) / 5 for i in range(3000)]}
+    kern = [((3 * i) % 13 - 6) / 60 for i in range(700)]
+    compare_sounds(
+        lab.convolve(inp, kern, method="fft"),
+        lab.convolve(inp, kern, method="direct"),
+        eps=1e-9,
+    )
+
+
+@pytest.mark.parametrize("test_number", [1, 2])
+def test_convolve_parallel(test_number):
+    inps, exp = load_pickle_pair("convolve_%02d.pickle" % test_number)
+    inps2 = copy.deepcopy(inps)
+    compare_sounds(lab.convolve_parallel(*inps, workers=2, segments=5), exp)
+    assert inps == inps2, "be careful not to modify the inputs!"
+
+    # segments shorter than the kernel
+    inp = {"rate": 3, "samples": [1, 2, 3, 4, 5, 6, 7]}
+    kern = [1, -1, 0.5, 0, 2]
+    compare_sounds(
+        lab.convolve_parallel(inp, kern, workers=2, segments=7),
+        lab.convolve(inp, kern),
+    )
+
+
+def test_convolve_sparse_kernel():
+    inp = {"rate": 10, "samples": [1, -2, 3]}
+    inp2 = copy.deepcopy(inp)
+    kern = [0] * 5000
+    kern[0] = 1
+    kern[4999] = 0.5
+    res = lab.convolve(inp, kern)
+    assert len(res["samples"]) == 5002
+    assert list(res["samples"][:3]) == [1, -2, 3]
+    assert list(res["samples"][4999:]) == [0.5, -1, 1.5]
+    assert not any(res["samples"][3:4999])
+    assert inp == inp2, "be careful not to modify the inputs!"
+
+
+def test_bass_boost_kernel_closed_form(tmp_path):
+    # (1/4, 1/2, 1/4) convolved with itself twice more
+    low = [1 / 64, 6 / 64, 15 / 64, 20 / 64, 15 / 64, 6 / 64, 1 / 64]
+    exp = [2 * v for v in low]
+    exp[3] += 1
+    kern = lab.bass_boost_kernel(2, 2)
+    assert kern == exp
+
+    kern[3] = 100  # callers get their own copy
+    assert lab.bass_boost_kernel(2, 2) == exp
+
+    big = lab.bass_boost_kernel(300, 1.5, cache_dir=str(tmp_path))
+    assert len(big) == 2 * 301 + 1
+    assert abs(sum(big) - 2.5) < 1e-9
+    assert os.listdir(str(tmp_path)) == ["bass_boost_300_1.5.kernel"]
+    lab._bass_boost_kernel.cache_clear()
+    assert lab.bass_boost_kernel(300, 1.5, cache_dir=str(tmp_path)) == big
+
+
 def test_echo_small():
     inp = {
         "rate": 9,
@@ -210,6 +382,45 @@ def test_echo_random(test_number):
     assert inps == inps2, "be careful not to modify the inputs!"
 
 
+@pytest.mark.parametrize("test_number", [1, 2])
+def test_echo_feedback_random(test_number):
+    inps, exp = load_pickle_pair("echo_%02d.pickle" % test_number)
+    inps2 = copy.deepcopy(inps)
+    compare_sounds(lab.echo(*inps, feedback=True), exp)
+    assert inps == inps2, "be careful not to modify the inputs!"
+
+
+def test_echo_feedback_small():
+    inp = {"rate": 9, "samples": [1, 2, 3]}
+    exp = {
+        "rate": 9,
+        "samples": [1, 2, 3, 0, 0, 0.7, 1.4, 2.1, 0, 0, 0.49, 0.98, 1.47],
+    }
+    compare_sounds(lab.echo(inp, 2, 0.6, 0.7, feedback=True), exp)
+
+    # overlapping echoes, and many of them
+    inp = {"rate": 10, "samples": [1, -1, 2, 0.5, 3]}
+    for num_echoes in (0, 1, 3, 40):
+        compare_sounds(
+            lab.echo(inp, num_echoes, 0.2, 0.9, feedback=True),
+            lab.echo(inp, num_echoes, 0.2, 0.9),
+            eps=1e-9,
+        )
+
+    # zero delay stacks every copy on the original
+    exp = {"rate": 10, "samples": [1.75, -1.75, 3.5, 0.875, 5.25]}
+    compare_sounds(lab.echo(inp, 2, 0.01, 0.5), exp)
+
+    # growing echoes, where the cancelling term would overflow
+    loud = lab.echo(inp, 2000, 0.1, 1.5, feedback=True)
+    assert len(loud["samples"]) == 5 + 2000
+    assert loud["samples"][:3] == lab.echo(inp, 2000, 0.1, 1.5)["samples"][:3]
+    compare_sounds(
+        lab.echo(inp, 5, 0.2, 1.5, feedback=True), lab.echo(inp, 5, 0.2, 1.5)
+    )
+    assert lab.echo(inp, 2000, 0, 1.5)["samples"][0] == math.inf
+
+
 def test_pan_small():
     inp = {
         "rate": 42,
@@ -265,3 +476,514 @@ def test_remove_vocals_random(test_number):
     inps2 = copy.deepcopy(inps)
     compare_sounds(lab.remove_vocals(*inps), exp)
     assert inps == inps2, "be careful not to modify the input!"
+
+
+def write_pcm16(filename, channels, frames, rate=8000):
+    with wave.open(str(filename), "w") as f:
+        f.setparams((channels, 2, rate, 0, "NONE", "not compressed"))
+        f.writeframes(b"".join(struct.pack("<h", v) for v in frames))
+
+
+def test_load_wav_decodes_in_bulk(tmp_path, monkeypatch):
+    monkeypatch.setattr(lab, "WAV_CHUNK_FRAMES", 3)
+    frames = [0, 16384, -32768, 32767, -16384, 8192, 1, -1]
+
+    write_pcm16(tmp_path / "mono.wav", 1, frames)
+    mono = lab.load_wav(str(tmp_path / "mono.wav"))
+    compare_sounds(mono, {"rate": 8000, "samples": [v / 2**15 for v in frames]})
+    stereo = lab.load_wav(str(tmp_path / "mono.wav"), stereo=True)
+    assert list(stereo["left"]) == list(stereo["right"]) == list(mono["samples"])
+
+    write_pcm16(tmp_path / "stereo.wav", 2, frames)
+    exp_left = [v / 2**15 for v in frames[0::2]]
+    exp_right = [v / 2**15 for v in frames[1::2]]
+    stereo = lab.load_wav(str(tmp_path / "stereo.wav"), stereo=True)
+    compare_sounds(stereo, {"rate": 8000, "left": exp_left, "right": exp_right})
+    mono = lab.load_wav(str(tmp_path / "stereo.wav"))
+    exp_mono = [(l + r) / 2 for l, r in zip(exp_left, exp_right)]
+    compare_sounds(mono, {"rate": 8000, "samples": exp_mono})
+
+
+def test_write_wav_encodes_in_bulk(tmp_path, monkeypatch):
+    monkeypatch.setattr(lab, "WAV_CHUNK_FRAMES", 3)
+    left = [0, 0.5, -0.5, 1.5, -1.5, 0.25, -1]
+    right = [1, -1, 0.125, 0, 2, -2]
+    expected = []
+    for l, r in zip(left, right):
+        expected.extend(int(max(-1, min(1, v)) * (2**15 - 1)) for v in (l, r))
+
+    outfile = str(tmp_path / "out.wav")
+    lab.write_wav({"rate": 8000, "left": left, "right": right}, outfile)
+    with wave.open(outfile, "r") as f:
+        assert f.getnchannels() == 2
+        assert f.getnframes() == len(right)
+        frames = f.readframes(f.getnframes())
+    assert list(struct.unpack("<%dh" % len(expected), frames)) == expected
+
+    lab.write_wav({"rate": 8000, "samples": left}, outfile)
+    with wave.open(outfile, "r") as f:
+        assert f.getnchannels() == 1
+        frames = f.readframes(f.getnframes())
+    expected = [int(max(-1, min(1, v)) * (2**15 - 1)) for v in left]
+    assert list(struct.unpack("<%dh" % len(left), frames)) == expected
+
+
+def chunked(sound, sizes):
+    # split a sound into chunks of the given sizes, repeating the last size
+    names = ["samples"] if "samples" in sound else ["left", "right"]
+    length = len(sound[names[0]])
+    start, ix = 0, 0
+    while start < length:
+        stop = start + sizes[min(ix, len(sizes) - 1)]
+        yield {"rate": sound["rate"], **{n: sound[n][start:stop] for n in names}}
+        start, ix = stop, ix + 1
+
+
+def joined(chunks):
+    chunks = list(chunks)
+    names = ["samples"] if "samples" in chunks[0] else ["left", "right"]
+    out = {"rate": chunks[0]["rate"]}
+    for n in names:
+        out[n] = [v for chunk in chunks for v in chunk[n]]
+    return out
+
+
+def test_streaming_effects_match_whole_sound():
+    for name in ("mix", "echo", "convolve"):
+        inps, exp = load_pickle_pair("%s_01.pickle" % name)
+        stream = getattr(lab, "stream_" + name)
+        if name == "mix":
+            res = stream(chunked(inps[0], [1000, 7]), chunked(inps[1], [333]), inps[2])
+        else:
+            res = stream(chunked(inps[0], [5, 4096]), *inps[1:])
+        compare_sounds(joined(res), exp)
+
+    for name in ("pan", "remove_vocals"):
+        inps, exp = load_pickle_pair("%s_01.pickle" % name)
+        if name == "pan":
+            res = lab.stream_pan(chunked(inps[0], [999]), len(inps[0]["left"]))
+        else:
+            res = lab.stream_remove_vocals(chunked(inps[0], [999]))
+        compare_sounds(joined(res), exp)
+
+
+def test_wav_chunks_round_trip(tmp_path):
+    inps, _ = load_pickle_pair("pan_01.pickle")
+    outfile = str(tmp_path / "out.wav")
+    lab.write_wav_chunks(chunked(inps[0], [100, 3000]), outfile)
+    whole = lab.load_wav(outfile, stereo=True)
+    res = joined(lab.load_wav_chunks(outfile, stereo=True, chunk_frames=1234))
+    compare_sounds(res, whole)
+    compare_sounds(res, inps[0], eps=2 / (2**15 - 1))
+
+
+def test_wav_map_reads_windows(tmp_path):
+    frames = list(range(-500, 500, 5))
+    write_pcm16(tmp_path / "stereo.wav", 2, frames, rate=11025)
+    whole = lab.load_wav(str(tmp_path / "stereo.wav"), stereo=True)
+    mono = lab.load_wav(str(tmp_path / "stereo.wav"))
+
+    with lab.WavMap(str(tmp_path / "stereo.wav")) as wav:
+        assert (wav.channels, wav.rate, len(wav)) == (2, 11025, len(frames) // 2)
+        assert wav.pcm[:4].tolist() == frames[:4]
+        compare_sounds(wav.read(stereo=True), whole)
+        window = wav.read(10, 20, stereo=True)
+        assert list(window["left"]) == list(whole["left"][10:20])
+        assert list(window["right"]) == list(whole["right"][10:20])
+        assert list(wav.read(-5)["samples"]) == list(mono["samples"][-5:])
+        assert len(wav.read(60, 10)["samples"]) == 0
+
+    (tmp_path / "bogus.wav").write_bytes(b"not a wav file at all")
+    with pytest.raises(ValueError):
+        lab.WavMap(str(tmp_path / "bogus.wav"))
+
+
+def test_batch_render(tmp_path):
+    inps, _ = load_pickle_pair("pan_01.pickle")
+    src = tmp_path / "in"
+    src.mkdir()
+    for name in ("a.wav", "b.wav"):
+        lab.write_wav(inps[0], str(src / name))
+    chain = [
+        ["remove_vocals"],
+        ["convolve", {"kernel": {"bass_boost_kernel": [3, 0.5]}}],
+        ("echo", {"num_echoes": 2, "delay": 0.001, "scale": 0.5}),
+    ]
+    seen = []
+    results = batch.render_batch(
+        str(src), chain, str(tmp_path / "out"), workers=2,
+        progress=lambda done, total, result: seen.append((done, total)),
+    )
+    assert sorted(seen) == [(1, 2), (2, 2)]
+    assert sorted(r["file"] for r in results) == [str(src / "a.wav"), str(src / "b.wav")]
+
+    expected = lab.load_wav(str(src / "a.wav"), stereo=True)
+    expected = lab.remove_vocals(expected)
+    expected = lab.convolve(expected, lab.bass_boost_kernel(3, 0.5))
+    expected = lab.echo(expected, 2, 0.001, 0.5)
+    lab.write_wav(expected, str(tmp_path / "expected.wav"))
+    expected = lab.load_wav(str(tmp_path / "expected.wav"))
+    for result in results:
+        assert "error" not in result
+        assert result["frames"] == len(expected["samples"])
+        assert result["total"] >= result["effects"] >= 0
+        compare_sounds(lab.load_wav(result["output"]), expected)
+
+    with pytest.raises(ValueError):
+        batch.render_batch(str(src), ["louder"], str(tmp_path / "out"))
+
+
+def test_graph_matches_eager_effects(tmp_path):
+    inps, _ = load_pickle_pair("pan_01.pickle")
+    stereo = inps[0]
+    kern = lab.bass_boost_kernel(5, 0.5)
+    mono = lab.remove_vocals(stereo)
+
+    node = graph.source(stereo)
+    vocals = node.remove_vocals()
+    tree = graph.mix(vocals.echo(2, 0.01, 0.5), vocals.convolve(kern).backwards(), 0.3)
+    exp = lab.mix(
+        lab.echo(mono, 2, 0.01, 0.5), lab.backwards(lab.convolve(mono, kern)), 0.3
+    )
+    assert tree.length == len(exp["samples"])
+    for block_frames in (1000, 4096):
+        compare_sounds(tree.render(block_frames), exp)
+
+    compare_sounds(node.pan().backwards().render(777), {
+        "rate": stereo["rate"],
+        "left": lab.pan(stereo)["left"][::-1],
+        "right": lab.pan(stereo)["right"][::-1],
+    })
+
+    lab.write_wav(stereo, str(tmp_path / "in.wav"))
+    loaded = lab.load_wav(str(tmp_path / "in.wav"), stereo=True)
+    wav = graph.load(str(tmp_path / "in.wav"), stereo=True)
+    wav.pan().remove_vocals().backwards().write(str(tmp_path / "out.wav"), 500)
+    exp = lab.backwards(lab.remove_vocals(lab.pan(loaded)))
+    compare_against_file(exp, str(tmp_path / "out.wav"))
+
+    with pytest.raises(ValueError):
+        graph.mix(node, vocals, 0.5)
+    with pytest.raises(ValueError):
+        vocals.pan()
+    assert not tree.seekable
+    with pytest.raises(TypeError):
+        tree.read(0, 10)
+
+
+def test_bench_runs_and_compares():
+    results = bench.run_benchmarks(scales=[0.01], kernel_sizes=[3, 301])
+    assert [(r["effect"], r["kernel"]) for r in results] == [
+        ("backwards", None), ("mix", None), ("echo", None), ("pan", None),
+        ("remove_vocals", None), ("convolve", 3), ("convolve", 301),
+        ("load_wav", None), ("write_wav", None),
+    ]
+    for result in results:
+        assert result["samples"] == 441
+        assert result["throughput"] > 0 and result["peak_bytes"] > 0
+
+    assert bench.compare(results, results) == []
+    faster = [dict(r, throughput=r["throughput"] * 2) for r in results]
+    regressions = bench.compare(results, faster, tolerance=0.2)
+    assert len(regressions) == len(results)
+    assert bench.compare(results, faster, tolerance=0.6) == []
+
+
+def test_multichannel(tmp_path):
+    frames = [((17 * i) % 200 - 100) * 300 for i in range(6 * 50)]
+    write_pcm16(tmp_path / "six.wav", 6, frames)
+    snd = lab.load_wav(str(tmp_path / "six.wav"), multichannel=True)
+    assert snd["channels"] == 6
+    assert list(snd["interleaved"]) == [v / 2**15 for v in frames]
+
+    mono = lab.load_wav(str(tmp_path / "six.wav"))
+    exp = [sum(frames[i:i + 6]) / 6 / 2**15 for i in range(0, len(frames), 6)]
+    compare_sounds(mono, {"rate": 8000, "samples": exp})
+    stereo = lab.load_wav(str(tmp_path / "six.wav"), stereo=True)
+    assert list(stereo["right"]) == [v / 2**15 for v in frames[1::6]]
+
+    lab.write_wav(snd, str(tmp_path / "copy.wav"))
+    with wave.open(str(tmp_path / "copy.wav"), "r") as f:
+        assert f.getnchannels() == 6 and f.getnframes() == 50
+    again = lab.load_wav(str(tmp_path / "copy.wav"), multichannel=True)
+    compare_sounds(
+        {"rate": 8000, "samples": again["interleaved"]},
+        {"rate": 8000, "samples": snd["interleaved"]},
+        eps=2 / (2**15 - 1),
+    )
+
+    with lab.WavMap(str(tmp_path / "six.wav")) as wav:
+        window = wav.read(10, 12, multichannel=True)
+        assert list(window["interleaved"]) == list(snd["interleaved"][60:72])
+
+    vocals = lab.remove_vocals(snd)
+    exp = [(a - b) / 2**15 for a, b in zip(frames[0::6], frames[1::6])]
+    compare_sounds(vocals, {"rate": 8000, "samples": exp})
+
+    mixed = lab.mix(snd, snd, 0.25)
+    assert mixed["channels"] == 6
+    compare_sounds(
+        {"rate": 8000, "samples": mixed["interleaved"]},
+        {"rate": 8000, "samples": snd["interleaved"]},
+    )
+    with pytest.raises(ValueError):
+        lab.mix_many([snd, mono])
+
+
+def test_multichannel_pan():
+    inps, exp = load_pickle_pair("pan_01.pickle")
+    left, right = inps[0]["left"], inps[0]["right"]
+    interleaved = [v for frame in zip(left, right) for v in frame]
+    res = lab.pan({"rate": exp["rate"], "channels": 2, "interleaved": interleaved})
+    res = {
+        "rate": res["rate"],
+        "left": res["interleaved"][0::2],
+        "right": res["interleaved"][1::2],
+    }
+    compare_sounds(res, exp)
+
+    res = lab.pan({"rate": 10, "channels": 3, "interleaved": [1] * 15})
+    exp = [1, 0, 0, 0.5, 0.5, 0, 0, 1, 0, 0, 0.5, 0.5, 0, 0, 1]
+    compare_sounds(
+        {"rate": 10, "samples": res["interleaved"]}, {"rate": 10, "samples": exp}
+    )
+
+
+
+def test_multichannel_streaming(tmp_path):
+    frames = [((13 * i) % 200 - 100) * 250 for i in range(3 * 100)]
+    write_pcm16(tmp_path / "three.wav", 3, frames)
+    filename = str(tmp_path / "three.wav")
+    whole = lab.load_wav(filename, multichannel=True)
+    channels = [
+        {"rate": 8000, "samples": whole["interleaved"][c::3]} for c in range(3)
+    ]
+
+    def chunks():
+        return lab.load_wav_chunks(filename, chunk_frames=30, multichannel=True)
+
+    def check(res, expected):
+        # deinterleave the joined result and compare it channel by channel
+        data = [v for chunk in res for v in chunk["interleaved"]]
+        assert len(data) == 3 * len(expected[0]["samples"])
+        for c in range(3):
+            compare_sounds({"rate": expected[c]["rate"], "samples": data[c::3]},
+                           expected[c])
+
+    odd = lab.load_wav_chunks(filename, chunk_frames=7, multichannel=True)
+    check(lab.stream_mix(chunks(), odd, 0.25), channels)
+    check(lab.stream_echo(chunks(), 2, 0.001, 0.5),
+          [lab.echo(c, 2, 0.001, 0.5) for c in channels])
+    check(lab.stream_convolve(chunks(), [1, 0.5, 0.25, 0, -1]),
+          [lab.convolve(c, [1, 0.5, 0.25, 0, -1]) for c in channels])
+    panned = lab.pan(whole)
+    check(lab.stream_pan(chunks(), 100),
+          [{"rate": 8000, "samples": panned["interleaved"][c::3]} for c in range(3)])
+    check(lab.stream_resample(chunks(), 16000),
+          [lab.resample(c, 16000) for c in channels])
+
+    lab.write_wav_chunks(lab.stream_echo(chunks(), 2, 0.001, 0.5),
+                         str(tmp_path / "out.wav"))
+    res = lab.load_wav(str(tmp_path / "out.wav"), multichannel=True)
+    assert res["channels"] == 3 and len(res["interleaved"]) == 3 * 116
+    with pytest.raises(ValueError):
+        list(lab.stream_mix(chunks(), [{"rate": 8000, "samples": [0.5]}], 0.5))
+    with pytest.raises(ValueError):
+        list(lab.stream_mix(
+            [{"rate": 8000, "samples": [0.5]}],
+            [{"rate": 8000, "left": [0.5], "right": [0.5]}],
+            0.5,
+        ))
+
+@pytest.mark.parametrize("sample_format", sorted(lab.SAMPLE_FORMATS))
+def test_sample_formats(tmp_path, sample_format):
+    values = [(i % 200 - 100) / 128 for i in range(2 * 301)]
+    snd = {"rate": 8000, "left": values[0::2], "right": values[1::2]}
+    filename = str(tmp_path / "formats.wav")
+    lab.write_wav(snd, filename, sample_format)
+
+    res = lab.load_wav(filename, stereo=True)
+    tolerance = {"uint8": 1 / 64, "int16": 1e-4}.get(sample_format, 1e-6)
+    for name in ("left", "right"):
+        assert len(res[name]) == 301
+        assert all(
+            abs(a - b) <= tolerance for a, b in zip(res[name], snd[name])
+        )
+    mono = lab.load_wav(filename)
+    assert all(
+        abs(m - (l + r) / 2) < 1e-12
+        for m, l, r in zip(mono["samples"], res["left"], res["right"])
+    )
+    with lab.WavMap(filename) as wav:
+        assert wav.sample_format == sample_format
+        compare_sounds(wav.read(100, 200, stereo=True),
+                       {"rate": 8000, "left": res["left"][100:200],
+                        "right": res["right"][100:200]})
+
+
+def test_sample_format_clipping(tmp_path):
+    snd = {"rate": 8000, "samples": [-3, -1, -0.5, 0, 0.5, 1, 3]}
+    for sample_format in ("uint8", "int24", "int32"):
+        filename = str(tmp_path / f"{sample_format}.wav")
+        lab.write_wav(snd, filename, sample_format)
+        res = lab.load_wav(filename)["samples"]
+        assert res[0] == res[1] and res[-1] == res[-2]
+        assert abs(res[-1] - 1) < 1e-2 and abs(res[0] + 1) < 1e-2
+    lab.write_wav(snd, str(tmp_path / "float.wav"), "float32")
+    res = lab.load_wav(str(tmp_path / "float.wav"))["samples"]
+    assert list(res) == snd["samples"]
+
+
+def test_extensible_float_wav(tmp_path):
+    # WAVE_FORMAT_EXTENSIBLE header with an IEEE float sub-format and a
+    # chunk before fmt, as written by many audio editors
+    samples = [0.25, -0.5, 0.75, -1.0, 1.5]
+    data = struct.pack(f"<{len(samples)}f", *samples)
+    fmt = struct.pack("<HHIIHHHHI", 0xFFFE, 1, 8000, 32000, 4, 32, 22, 32, 4)
+    fmt += struct.pack("<H14s", 3, b"\x00\x00\x00\x00\x10\x00\x80\x00\x00\xaa\x00\x38\x9b\x71")
+    body = (b"WAVE" + b"LIST" + struct.pack("<I", 3) + b"abc\0"
+            + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+            + b"data" + struct.pack("<I", len(data)) + data)
+    filename = tmp_path / "extensible.wav"
+    filename.write_bytes(b"RIFF" + struct.pack("<I", len(body)) + body)
+
+    res = lab.load_wav(str(filename))
+    assert res["rate"] == 8000
+    assert list(res["samples"]) == samples
+
+
+@pytest.mark.parametrize("name", ["backwards", "pan", "remove_vocals"])
+def test_inplace(name, monkeypatch):
+    monkeypatch.setattr(lab, "WAV_CHUNK_FRAMES", 1000)
+    inps, exp = load_pickle_pair(f"{name}_01.pickle")
+    snd = lab.Sound(inps[0])
+    buffers = {id(v) for k, v in snd.items() if k != "rate"}
+    res = getattr(lab, name)(snd, inplace=True)
+    assert res is snd
+    compare_sounds(res, exp)
+    assert all(id(res[k]) in buffers for k in res if k != "rate")
+
+
+def test_inplace_multichannel():
+    frames = [((7 * i) % 50 - 25) / 25 for i in range(3 * 41)]
+    snd = lab.Sound(rate=10, channels=3, interleaved=frames)
+    exp = lab.pan(snd)
+    buffer = snd["interleaved"]
+    assert lab.pan(snd, inplace=True)["interleaved"] is buffer
+    assert buffer == exp["interleaved"]
+
+    exp = lab.remove_vocals(snd)
+    res = lab.remove_vocals(snd, inplace=True)
+    assert res is snd and res["samples"] is buffer
+    assert set(res) == {"rate", "samples"}
+    assert buffer == exp["samples"]
+
+
+@pytest.mark.parametrize("block_size", [16, 256])
+def test_partitioned_convolver(block_size):
+    inps, _ = load_pickle_pair("pan_01.pickle")
+    kernel = lab.bass_boost_kernel(200, 1.5)
+    res = realtime.convolve(inps[0], kernel, block_size)
+    for name in ("left", "right"):
+        exp = lab.convolve({"rate": inps[0]["rate"], "samples": inps[0][name]}, kernel)
+        compare_sounds({"rate": res["rate"], "samples": res[name]}, exp)
+
+
+
+def test_partitioned_convolver_small():
+    mono = {"rate": 8, "samples": [1, 0, 0, 0, 0, -1, 0.5]}
+    for block_size in (1, 2, 8):
+        res = realtime.convolve(mono, [0.5, 0.25, 0, 0, 2], block_size)
+        compare_sounds(res, lab.convolve(mono, [0.5, 0.25, 0, 0, 2]))
+
+
+def test_partitioned_convolver_blocks():
+    kernel = [1, 2, 3, 4, 5, 6, 7]
+    engine = realtime.PartitionedConvolver(kernel, block_size=4)
+    assert engine.latency == 4
+    # an impulse comes out in the very same block
+    assert list(engine.process([1, 0, 0, 0])) == pytest.approx([1, 2, 3, 4])
+    assert list(engine.process([0, 0, 0, 0])) == pytest.approx([5, 6, 7, 0])
+    engine.process([0, 0, 0, 2])
+    assert list(engine.flush()) == pytest.approx([4, 6, 8, 10, 12, 14])
+    assert list(engine.process([0, 1, 0, 0])) == pytest.approx([0, 1, 2, 3])
+
+    with pytest.raises(ValueError):
+        engine.process([1, 2, 3])
+    with pytest.raises(ValueError):
+        realtime.PartitionedConvolver(kernel, block_size=6)
+
+
+def test_instrument(tmp_path):
+    originals = {name: getattr(lab, name) for name in instrument.public_functions()}
+    assert "convolve" in originals and "_padded" not in originals
+    snd = lab.Sound(rate=8000, samples=[0.1 * (i % 7) for i in range(3000)])
+    filename = str(tmp_path / "out.wav")
+
+    with instrument.profile(memory=True, file=False) as stats:
+        assert lab.convolve is not originals["convolve"]
+        lab.write_wav(lab.echo(snd, 2, 0.01, 0.5), filename)
+        lab.mix(snd, snd, 0.5)
+        chunks = list(lab.load_wav_chunks(filename, chunk_frames=1000))
+    assert {name: getattr(lab, name) for name in originals} == originals
+    assert not instrument.enabled()
+
+    assert stats["echo"].calls == 1 and stats["echo"].samples == 3000
+    assert stats["mix_many"].samples == stats["mix"].samples == 6000
+    assert stats["write_wav"].samples == 3160
+    assert stats["write_wav_chunks"].calls == 1
+    assert stats["load_wav_chunks"].samples == 3160
+    assert stats["write_wav"].time >= stats["write_wav_chunks"].time > 0
+    assert stats["echo"].peak_bytes > 3000 * 8
+    assert len(chunks) == 4 and "convolve" not in stats
+    assert instrument.stats() == stats
+
+    lab.echo(snd, 2, 0.01, 0.5)
+    assert instrument.stats()["echo"].calls == 1
+
+
+def test_stft():
+    samples = [math.sin(0.3 * i) + 0.1 * (i % 3) for i in range(300)]
+    frames = spectral.stft({"rate": 8, "samples": samples}, 64, 16)
+    window = spectral._window("hann", 64)
+    assert len(frames) == 19
+    for index, frame in enumerate(frames):
+        segment = samples[index * 16:index * 16 + 64]
+        exp = [
+            sum(window[i] * v * complex(math.cos(2 * math.pi * k * i / 64),
+                                        -math.sin(2 * math.pi * k * i / 64))
+                for i, v in enumerate(segment))
+            for k in range(33)
+        ]
+        assert all(abs(a - b) < 1e-9 for a, b in zip(frame, exp))
+
+    stereo = {"rate": 8, "left": samples, "right": samples}
+    chunks = chunked(stereo, [50, 7, 100])
+    streamed = list(spectral.stream_stft(chunks, 64, 16))
+    assert len(streamed) == len(frames)
+    for frame, exp in zip(streamed, frames):
+        assert frame == pytest.approx(exp)
+
+
+def test_spectrogram_peak():
+    snd = {"rate": 8000, "samples": tone(8000, 4000, freq=1000)}
+    spec = spectral.spectrogram(snd, 256, db=True)
+    assert spec["times"][:2] == [0, 64 / 8000]
+    assert len(spec["times"]) == len(spec["magnitudes"]) == 63
+    for frame in spec["magnitudes"][:50]:
+        peak = max(range(len(frame)), key=frame.__getitem__)
+        assert spec["frequencies"][peak] == 1000
+        assert frame[peak] > frame[0] + 60
+
+
+def test_frequency_response():
+    freqs, response = spectral.frequency_response([1], 8, rate=16)
+    assert freqs == [0, 2, 4, 6, 8]
+    assert response == pytest.approx([1] * 5)
+
+    kernel = lab.bass_boost_kernel(100, 1.5)
+    freqs, gains = spectral.magnitude_response(kernel, db=True)
+    assert len(freqs) == len(gains) == 513 and freqs[-1] == 0.5
+    assert gains[0] > gains[256] + 6
+    with pytest.raises(ValueError):
+        spectral.frequency_response(kernel, 64)
@@ -2,8 +2,11 @@
 Autocomplete
 """
 
-# NO ADDITIONAL IMPORTS!
+# Standard library only: no third-party imports!
+import heapq
 import doctest
+import itertools
+from array import array
 from text_tokenize import tokenize_sentences
 
 
@@ -15,6 +18,13 @@ class PrefixTree:
         self.value = None
         self.children = {}
 
+    def _child_node(self):
+        """
+        Returns a new, empty node to hang below this one.  Subclasses
+        override this so that their trees are made of their own nodes.
+        """
+        return type(self)()
+
     def __setitem__(self, key, value):
         """
         Add a key with the given value to the prefix tree,
@@ -28,16 +38,14 @@ class PrefixTree:
         # key isnt a string
         if not isinstance(key, str):
             raise TypeError
-        # key doesn't exist so set value
-        if not key:
-            self.value = value
-        else:
-            # check if first letter in children and add if not
-            current = key[0]
-            if current not in self.children:
-                self.children[current] = PrefixTree()
-            # recursively set/add value from rest of letters in key
-            self.children[current].__setitem__(key[1:], value)
+        node = self
+        # walk down the key one letter at a time, adding missing nodes
+        for letter in key:
+            child = node.children.get(letter)
+            if child is None:
+                child = node.children[letter] = node._child_node()
+            node = child
+        node.value = value
 
     def __getitem__(self, key):
         """
@@ -48,15 +56,11 @@ class PrefixTree:
         # key isn't a string
         if not isinstance(key, str):
             raise TypeError
-
-        if len(key) == 1:
-            # return value that letter node maps to
-            if key in self.children and self.children[key].value is not None:
-                return self.children[key].value
-            # key not found or value is None
-            raise KeyError
-        current = key[0]
-        return self.children[current].__getitem__(key[1:])
+        node = self._find(key)
+        # key not found or value is None
+        if node is None or node.value is None:
+            raise KeyError(key)
+        return node.value
 
     def __delitem__(self, key):
         """
@@ -77,39 +81,520 @@ class PrefixTree:
         # key not string
         if not isinstance(key, str):
             raise TypeError
-        # if reached end of key, return True if current node has a value
-        if len(key) == 0:
-            return self.value is not None
-        current = key[0]
-        # first letter not in tree so False
-        if current not in self.children:
-            return False
-        return self.children[current].__contains__(key[1:])
+        node = self._find(key)
+        return node is not None and node.value is not None
 
     def __iter__(self):
         """
         Generator of (key, value) pairs for all keys/values in this prefix tree
         and its children.  Must be a generator!
+
+        Keys come out in pre-order, children in insertion order.
+        """
+        # letters of the current node's key, shared by the whole traversal
+        prefix = []
+        # (node, its depth, the letter leading to it)
+        stack = [(self, 0, "")]
+        while stack:
+            node, depth, letter = stack.pop()
+            if depth:
+                del prefix[depth - 1:]
+                prefix.append(letter)
+            while True:
+                # value not None, then yield pair
+                if node.value is not None:
+                    yield "".join(prefix), node.value
+                if len(node.children) != 1:
+                    break
+                # follow chains of only children without using the stack
+                (letter, node), = node.children.items()
+                prefix.append(letter)
+                depth += 1
+            # push children reversed so the first one is visited first
+            stack.extend(
+                (child, depth + 1, letter)
+                for letter, child in reversed(node.children.items())
+            )
+
+    def _find(self, key):
+        """
+        Returns the node for key, or None if there is none.
+        """
+        node = self
+        for letter in key:
+            node = node.children.get(letter)
+            if node is None:
+                return None
+        return node
+
+
+class TopKPrefixTree(PrefixTree):
+    """
+    PrefixTree whose nodes also keep, in top, the k (value, key) pairs with
+    the largest values below them, largest first, for keys that are set
+    through the root.  The keys listed are the full keys from the root, so
+    autocomplete can answer from the node of its prefix in O(len(prefix) +
+    max_count) instead of sorting the whole subtree.  Values must be
+    comparable, like the counts word_frequencies makes.
+
+    Raising a value updates the lists along its key in place; lowering or
+    deleting a listed one rebuilds them from the children's lists.
+    """
+
+    def __init__(self, k=10):
+        """
+        Initializes instance of TopKPrefixTree, indexing the top k keys.
+        """
+        super().__init__()
+        self.k = k
+        self.top = []
+
+    def _child_node(self):
+        return TopKPrefixTree(self.k)
+
+    def __setitem__(self, key, value):
+        """
+        Add a key with the given value to the prefix tree,
+        or reassign the associated value if it is already present,
+        updating the top lists along the key.
+        Raise a TypeError if the given key is not a string.
+        """
+        if not isinstance(key, str):
+            raise TypeError
+        path = [self]
+        for letter in key:
+            node = path[-1]
+            child = node.children.get(letter)
+            if child is None:
+                child = node.children[letter] = node._child_node()
+            path.append(child)
+        old = path[-1].value
+        path[-1].value = value
+        # deepest first, since rebuilding a list reads the children's
+        entry = (value, key)
+        for depth in range(len(path) - 1, -1, -1):
+            path[depth]._rerank(entry, old, key, depth)
+
+    def top_keys(self, count):
+        """
+        Returns the count keys with the largest values below this node,
+        largest first, or None if the index is too short for that.
+        """
+        if count > self.k:
+            return None
+        return [key for _, key in self.top[:count]]
+
+    def _rerank(self, entry, old, key, depth):
+        """
+        Updates this node's top list after key (whose first depth letters
+        lead here) went from value old to entry's value.
+        """
+        top = self.top
+        value = entry[0]
+        for ix, (_, listed) in enumerate(top):
+            if listed == key:
+                break
+        else:
+            ix = None
+
+        if value is None or (old is not None and value < old):
+            # a listed key dropped: something below may now outrank it
+            if ix is not None:
+                candidates = [item for child in self.children.values()
+                              for item in child.top]
+                if self.value is not None:
+                    candidates.append((self.value, key[:depth]))
+                candidates.sort(key=lambda item: item[0], reverse=True)
+                self.top = candidates[:self.k]
+        elif ix is not None:
+            top[ix] = entry
+            top.sort(key=lambda item: item[0], reverse=True)
+        elif len(top) < self.k or value > top[-1][0]:
+            top.append(entry)
+            top.sort(key=lambda item: item[0], reverse=True)
+            del top[self.k:]
+
+
+class BestFirstPrefixTree(PrefixTree):
+    """
+    PrefixTree whose nodes also keep, in best, the largest value below them
+    (None if there is none), so that by_frequency can walk the tree best
+    first and stop as soon as enough keys have come out.  Values must be
+    comparable numbers, like the counts word_frequencies makes.
+    """
+
+    def __init__(self):
+        """
+        Initializes instance of BestFirstPrefixTree.
+        """
+        super().__init__()
+        self.best = None
+
+    def _child_node(self):
+        return BestFirstPrefixTree()
+
+    def __setitem__(self, key, value):
+        """
+        Add a key with the given value to the prefix tree,
+        or reassign the associated value if it is already present,
+        updating the subtree maximums along the key.
+        Raise a TypeError if the given key is not a string.
+        """
+        if not isinstance(key, str):
+            raise TypeError
+        path = [self]
+        for letter in key:
+            node = path[-1]
+            child = node.children.get(letter)
+            if child is None:
+                child = node.children[letter] = node._child_node()
+            path.append(child)
+        old = path[-1].value
+        path[-1].value = value
+        for node in reversed(path):
+            best = node.best
+            if value is not None and (best is None or value > best):
+                node.best = value
+            elif old is not None and old == best:
+                # the maximum may have been this key's old value
+                candidates = [child.best for child in node.children.values()
+                              if child.best is not None]
+                if node.value is not None:
+                    candidates.append(node.value)
+                node.best = max(candidates, default=None)
+            if node.best == best:
+                # nothing changes further up either
+                break
+
+    def by_frequency(self):
+        """
+        Generator of the (key, value) pairs in this prefix tree, largest
+        value first, found by a best-first search that only opens the nodes
+        whose maximum beats every key yielded so far.
+        """
+        # entries are (-priority, tie breaker, key, node); a node is opened
+        # at the priority of its subtree's best value, and its own value is
+        # pushed back as an entry with no node
+        heap = []
+        counter = 0
+        if self.best is not None:
+            heap.append((-self.best, counter, "", self))
+        while heap:
+            priority, _, key, node = heapq.heappop(heap)
+            if node is None:
+                yield key, -priority
+                continue
+            if node.value is not None:
+                counter += 1
+                heapq.heappush(heap, (-node.value, counter, key, None))
+            for letter, child in node.children.items():
+                if child.best is not None:
+                    counter += 1
+                    heapq.heappush(heap, (-child.best, counter, key + letter, child))
+
+
+class CompactPrefixTree:
+    """
+    PrefixTree with the same interface, stored as a double-array trie.
+
+    Instead of an object and a dict per node, every node is a cell in flat
+    parallel columns: the child of node s for character code c is cell
+    t = base[s] + c, provided that check[t] == s.  Values are held in a list
+    column (None meaning no value, as in PrefixTree).  A node costs a few
+    dozen bytes rather than a few hundred, and a lookup is a couple of array
+    reads per character.
+
+    children and the subtrees it returns are views into the same storage;
+    they are meant for reading (as sub_tree and word_filter do), since
+    adding keys may move cells and invalidate views other than the root.
+    """
+
+    def __init__(self):
+        """
+        Initializes instance of CompactPrefixTree.
+        """
+        self._cells = _DoubleArray()
+        self._cell = 0
+
+    @property
+    def value(self):
+        """
+        Value stored at this node (None if there is none).
+        """
+        return self._cells.values[self._cell]
+
+    @value.setter
+    def value(self, value):
+        self._cells.values[self._cell] = value
+
+    @property
+    def children(self):
+        """
+        Dictionary mapping each next character to a view of its subtree.
+        """
+        cells = self._cells
+        out = {}
+        for code, cell in cells.children(self._cell):
+            child = CompactPrefixTree.__new__(CompactPrefixTree)
+            child._cells, child._cell = cells, cell
+            out[cells.chars[code]] = child
+        return out
+
+    def __setitem__(self, key, value):
+        """
+        Add a key with the given value to the prefix tree,
+        or reassign the associated value if it is already present.
+        Raise a TypeError if the given key is not a string.
+        """
+        if not isinstance(key, str):
+            raise TypeError
+        cells = self._cells
+        base, check, codes = cells.base, cells.check, cells.codes
+        size = len(check)
+        cell = self._cell
+        # follow the nodes that already exist, then add the rest
+        for depth, char in enumerate(key):
+            code = codes.get(char)
+            child = base[cell] + code if code is not None else size
+            if child >= size or check[child] != cell:
+                for char in key[depth:]:
+                    cell = cells.add_child(cell, cells.code(char))
+                break
+            cell = child
+        cells.values[cell] = value
+
+    def __getitem__(self, key):
+        """
+        Return the value for the specified prefix.
+        Raise a KeyError if the given key is not in the prefix tree.
+        Raise a TypeError if the given key is not a string.
+        """
+        if not isinstance(key, str):
+            raise TypeError
+        cell = self._find(key)
+        if cell is None or self._cells.values[cell] is None:
+            raise KeyError(key)
+        return self._cells.values[cell]
+
+    def __delitem__(self, key):
+        """
+        Delete the given key from the prefix tree if it exists.
+        Raise a KeyError if the given key is not in the prefix tree.
+        Raise a TypeError if the given key is not a string.
+        """
+        self.__getitem__(key)
+        self._cells.values[self._find(key)] = None
+
+    def __contains__(self, key):
+        """
+        Is key a key in the prefix tree?  Return True or False.
+        Raise a TypeError if the given key is not a string.
+        """
+        if not isinstance(key, str):
+            raise TypeError
+        cell = self._find(key)
+        return cell is not None and self._cells.values[cell] is not None
+
+    def __iter__(self):
+        """
+        Generator of (key, value) pairs for all keys/values in this prefix tree
+        and its children, in pre-order.
+        """
+        cells = self._cells
+        base, check, values, chars = cells.base, cells.check, cells.values, cells.chars
+        width = len(chars)
+        root = self._cell
+        if values[root] is not None:
+            yield "", values[root]
+        # [cell, where to look for its next child] for the nodes whose
+        # characters are in prefix, below the root; children are found by
+        # searching check for the cell rather than by listing them
+        prefix = []
+        stack = [[root, base[root] + 1]] if base[root] else []
+        while stack:
+            top = stack[-1]
+            cell, start = top
+            try:
+                child = check.index(cell, start, base[cell] + width)
+            except ValueError:
+                stack.pop()
+                if stack:
+                    prefix.pop()
+                continue
+            top[1] = child + 1
+            prefix.append(chars[child - base[cell]])
+            if values[child] is not None:
+                yield "".join(prefix), values[child]
+            if base[child]:
+                stack.append([child, base[child] + 1])
+            else:
+                prefix.pop()
+
+    def _find(self, key):
+        """
+        Returns the cell of key, or None if there is no node for it.
+        """
+        cells = self._cells
+        base, check, codes = cells.base, cells.check, cells.codes
+        size = len(check)
+        cell = self._cell
+        for char in key:
+            code = codes.get(char)
+            if code is None:
+                return None
+            # a node without children has base 0, and no cell is checked
+            # against it, so that case needs no test of its own
+            child = base[cell] + code
+            if child >= size or check[child] != cell:
+                return None
+            cell = child
+        return cell
+
+
+class _DoubleArray:
+    """
+    Storage for CompactPrefixTree: the base, check and value columns, and
+    the mapping between characters and the codes used to index cells.
+    Cell 0 is the root; free cells have a check of FREE.
+    """
+
+    FREE = -1
+
+    def __init__(self):
+        self.base = array("i", [0])
+        self.check = array("i", [0])
+        self.values = [None]
+        # one byte per cell, 1 where the cell is taken
+        self.used = bytearray(b"\x01")
+        self.codes = {}
+        self.chars = [None]
+        # no free cell comes before _first_free, nor is any taken from _end on
+        self._first_free = self._end = 1
+
+    def code(self, char):
+        """
+        Returns the code of char, assigning the next one if it is new.
+        """
+        code = self.codes.get(char)
+        if code is None:
+            code = self.codes[char] = len(self.chars)
+            self.chars.append(char)
+        return code
+
+    def children(self, cell):
+        """
+        Returns the (code, cell) pairs of a node's children, by code.
+        """
+        base = self.base[cell]
+        if not base:
+            return []
+        check, stop = self.check, base + len(self.chars)
+        out = []
+        child = base
+        while True:
+            try:
+                child = check.index(cell, child + 1, stop)
+            except ValueError:
+                return out
+            out.append((child - base, child))
+
+    def add_child(self, cell, code):
+        """
+        Returns the child of cell for code, creating it if needed.
+        """
+        check = self.check
+        base = self.base[cell]
+        if base:
+            child = base + code
+            if child < len(check):
+                owner = check[child]
+                if owner == cell:
+                    return child
+                if owner != self.FREE:
+                    # taken by another node's child: move this node's children
+                    codes = [c for c, _ in self.children(cell)]
+                    base = self._relocate(cell, self._find_base(codes + [code]))
+        else:
+            base = self.base[cell] = self._find_base([code])
+        # free cells already have a base of 0
+        child = base + code
+        if child >= len(check):
+            self._reserve(child + 1)
+        check[child] = cell
+        self.used[child] = 1
+        if child >= self._end:
+            self._end = child + 1
+        return child
+
+    def _find_base(self, codes):
+        """
+        Returns a base at which the cells for all of codes are free.
+
+        A single cell goes in the first hole that fits; the children of a
+        node being relocated go past the last cell taken, leaving their old
+        cells as holes for the single cells to come.
+        """
+        low = min(codes)
+        if len(codes) == 1:
+            used = self.used
+            first = used.find(0, self._first_free)
+            if first < 0:
+                first = len(used)
+            self._first_free = first
+            cell = first if first > low else used.find(0, low + 1)
+            if 0 <= cell < len(used):
+                return cell - low
+        return max(self._end, low + 1) - low
+
+    def _relocate(self, cell, base):
+        """
+        Moves the children of cell to the given base and returns it.
+        """
+        check, values = self.check, self.values
+        moves = self.children(cell)
+        self._reserve(base + max(code for code, _ in moves) + 1)
+        for code, old in moves:
+            new = base + code
+            self.base[new] = self.base[old]
+            check[new] = cell
+            values[new] = values[old]
+            self.used[new] = 1
+            self._end = max(self._end, new + 1)
+            # the grandchildren now belong to the new cell
+            for _, grandchild in self.children(old):
+                check[grandchild] = new
+            self.base[old] = 0
+            check[old] = self.FREE
+            values[old] = None
+            self.used[old] = 0
+            self._first_free = min(self._first_free, old)
+        self.base[cell] = base
+        return base
+
+    def _reserve(self, size):
+        """
+        Grows the columns (by at least half) so they hold size cells.
         """
-        # value not None, then yield pair
-        if self.value is not None:
-            yield "", self.value
-        # iterate through all children and concatenate letters to yield key
-        for letter, child in self.children.items():
-            for key, value in child:
-                yield letter + key, value
+        extra = size - len(self.check)
+        if extra > 0:
+            extra = max(extra, len(self.check) // 2)
+            self.base.extend([0] * extra)
+            self.check.extend([self.FREE] * extra)
+            self.values.extend([None] * extra)
+            self.used.extend(bytes(extra))
 
 
-def word_frequencies(text):
+def word_frequencies(text, tree_class=PrefixTree):
     """
     Given a piece of text as a single string, create a prefix tree whose keys
     are the words in the text, and whose values are the number of times the
-    associated word appears in the text.
+    associated word appears in the text.  tree_class picks the prefix tree
+    implementation, such as CompactPrefixTree.
     """
     token = tokenize_sentences(text)
     # split sentence into list of words
     sentences = [sentence.split() for sentence in token]
-    freq_tree = PrefixTree()
+    freq_tree = tree_class()
     # iterate through each word per sentence
     for sentence in sentences:
         for word in sentence:
@@ -137,6 +622,19 @@ def autocomplete(tree, prefix, max_count=None):
     # prefix doesn't have tree
     if child_tree is None:
         return []
+    # negative counts drop words from the end of the full list, below
+    counted = isinstance(max_count, int) and max_count >= 0
+    # a TopKPrefixTree may have the answer already
+    if counted and isinstance(tree, TopKPrefixTree):
+        words = child_tree.top_keys(max_count)
+        if words is not None:
+            return words
+    # a BestFirstPrefixTree can stop once it has max_count words
+    if isinstance(tree, BestFirstPrefixTree) and (counted or max_count is None):
+        ranked = child_tree.by_frequency()
+        if counted:
+            ranked = itertools.islice(ranked, max_count)
+        return [prefix + word for word, _ in ranked]
     # generate key-values for prefix tree
     words_with_pref = list(child_tree)
     # sort words by frequencies
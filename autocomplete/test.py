@@ -498,3 +498,158 @@ def test_filter_big_2():
         expected = read_expected('frank_filter_%s.pickle' % (ix, ))
         assert len(expected) == len(result), 'incorrect word_filter of %r' % i
         assert set(expected) == set(result), 'incorrect word_filter of %r' % i
+
+
+def test_compact_tree():
+    t = lab.CompactPrefixTree()
+    t['man'] = ''
+    t['mat'] = 'object'
+    t['mattress'] = ()
+    t['map'] = 'pam'
+    t['me'] = 'you'
+    t['met'] = 'tem'
+    t['a'] = '?'
+    t['map'] = -1000
+    assert isinstance(iter(t), types.GeneratorType), "__iter__ must produce a generator"
+    expected = [('a', '?'), ('man', ''), ('map', -1000), ('mat', 'object'),
+                ('mattress', ()), ('me', 'you'), ('met', 'tem')]
+    assert sorted(t) == expected
+    assert t['mattress'] == () and 'mat' in t and 'ma' not in t and '' not in t
+    assert set(t.children) == {'m', 'a'} and t.children['a'].value == '?'
+    del t['mat']
+    assert sorted(t) == expected[:3] + expected[4:]
+    for i in ('mat', 'ma', 'cat'):
+        with pytest.raises(KeyError):
+            del t[i]
+    with pytest.raises(TypeError):
+        t[(1, 2, 3)] = 20
+    with pytest.raises(TypeError):
+        (1, 2, 3) in t
+
+
+def test_compact_tree_matches_prefix_tree():
+    text = ("man mat mattress map me met a man a a a map man met "
+            "cats cattle hat car act at chat crate act car act "
+            "naïve café 日本 日本語")
+    t = lab.word_frequencies(text)
+    c = lab.word_frequencies(text, lab.CompactPrefixTree)
+    assert isinstance(c, lab.CompactPrefixTree)
+    assert sorted(c) == sorted(t)
+    for prefix in ('', 'm', 'ma', 'ca', 'x', '日'):
+        assert set(lab.autocomplete(c, prefix, 3)) <= set(lab.autocomplete(t, prefix))
+        assert sorted(lab.autocomplete(c, prefix)) == sorted(lab.autocomplete(t, prefix))
+    assert set(lab.autocorrect(c, 'cat', 4)) == {"act", "car", "cats", "cattle"}
+    for pattern in ('*', 'ma?', '*t', '?a*', '日*'):
+        assert sorted(lab.word_filter(c, pattern)) == sorted(lab.word_filter(t, pattern))
+
+    # many distinct first letters force nodes' children to be moved
+    words = [a + b + c for a in 'abcdefgh' for b in 'ijklmnop' for c in 'qrstuvwx']
+    c = lab.CompactPrefixTree()
+    for ix, word in enumerate(words):
+        c[word] = ix
+        c[word[:2]] = -ix
+    assert all(c[word] == ix for ix, word in enumerate(words))
+    assert len(list(c)) == len(words) + 64
+
+
+def test_long_keys_and_order():
+    # longer than the recursion limit set above
+    key = 'ab/' * 5000
+    t = lab.PrefixTree()
+    t[key] = 1
+    t[key[:-1]] = 2
+    t['ab'] = 3
+    assert t[key] == 1 and key[:-1] in t and key[:-2] not in t
+    assert list(t) == [('ab', 3), (key[:-1], 2), (key, 1)]
+    del t[key]
+    assert key not in t and list(t) == [('ab', 3), (key[:-1], 2)]
+    with pytest.raises(KeyError):
+        t[key + 'x']
+
+    # pre-order, children in insertion order
+    t = lab.PrefixTree()
+    for ix, word in enumerate(['to', 'tea', 'ted', 'ten', 'a', 'inn', 'in', 'i', '']):
+        t[word] = ix
+    assert [k for k, _ in t] == ['', 'to', 'tea', 'ted', 'ten', 'a', 'i', 'in', 'inn']
+
+
+def test_child_node_hook():
+    class CountingTree(lab.PrefixTree):
+        made = 0
+
+        def _child_node(self):
+            CountingTree.made += 1
+            return CountingTree()
+
+    t = CountingTree()
+    t['cat'] = 1
+    t['car'] = 2
+    assert CountingTree.made == 4
+    assert isinstance(t.children['c'].children['a'], CountingTree)
+    w = lab.word_frequencies('cat car cat', CountingTree)
+    assert isinstance(w.children['c'], CountingTree) and w['cat'] == 2
+
+
+def test_top_k_tree():
+    text = "man mat mattress map me met a man a a a map man met mat mat mat"
+    t = lab.word_frequencies(text, lab.TopKPrefixTree)
+    assert sorted(t) == sorted(lab.word_frequencies(text))
+    assert t.top[:3] == [(4, 'a'), (4, 'mat'), (3, 'man')] or \
+        t.top[:3] == [(4, 'mat'), (4, 'a'), (3, 'man')]
+    assert lab.autocomplete(t, 'ma', 2) == ['mat', 'man']
+    assert lab.autocomplete(t, 'x', 2) == []
+    assert lab.autocomplete(t, 'm', -2) == \
+        lab.autocomplete(lab.word_frequencies(text), 'm', -2)
+
+    # a listed key dropping below others, then being deleted
+    t['mat'] = 1
+    assert lab.autocomplete(t, 'ma', 3) == ['man', 'map', 'mat'] or \
+        lab.autocomplete(t, 'ma', 3) == ['man', 'map', 'mattress']
+    del t['man']
+    assert lab.autocomplete(t, 'ma', 1) == ['map']
+    assert 'man' not in [key for _, key in t.children['m'].top]
+    # an unlisted key rising to the top
+    t['mattress'] = 10
+    assert lab.autocomplete(t, 'm', 2) == ['mattress', 'map']
+    assert lab.autocomplete(t, '', 1) == ['mattress']
+
+    small = lab.TopKPrefixTree(k=2)
+    for ix, word in enumerate(['ab', 'ac', 'ad', 'ae']):
+        small[word] = ix
+    assert small.top_keys(2) == ['ae', 'ad'] and small.top_keys(3) is None
+    # beyond k, autocomplete falls back to sorting the subtree
+    assert lab.autocomplete(small, 'a', 3) == ['ae', 'ad', 'ac']
+    del small['ae']
+    del small['ad']
+    assert lab.autocomplete(small, 'a', 2) == ['ac', 'ab']
+
+
+def test_best_first_tree():
+    text = "man mat mattress map me met a man a a a map man met mat mat mat"
+    t = lab.word_frequencies(text, lab.BestFirstPrefixTree)
+    assert sorted(t) == sorted(lab.word_frequencies(text))
+    ranked = t.by_frequency()
+    assert isinstance(ranked, types.GeneratorType)
+    assert [value for _, value in ranked] == [4, 4, 3, 2, 2, 1, 1]
+    assert t.best == 4 and t.children['m'].best == 4
+    assert lab.autocomplete(t, 'ma', 2) == ['mat', 'man']
+    assert lab.autocomplete(t, 'me') == ['met', 'me']
+    assert lab.autocomplete(t, 'x', 2) == []
+    # negative counts slice like the other trees
+    plain = lab.word_frequencies(text)
+    for count in (-1, -3, -10):
+        assert lab.autocomplete(t, 'm', count) == lab.autocomplete(plain, 'm', count)
+    assert len(lab.autocomplete(t, 'm', -1)) == 5
+
+    t['mat'] = 1
+    assert t.children['m'].best == 3
+    del t['man']
+    assert t.children['m'].children['a'].best == 2
+    assert lab.autocomplete(t, 'ma', 2) == ['map', 'mat'] or \
+        lab.autocomplete(t, 'ma', 2) == ['map', 'mattress']
+    t['mattress'] = 10
+    assert list(t.children['m'].children['a'].by_frequency())[:2] == \
+        [('ttress', 10), ('p', 2)]
+    for key, _ in list(t):
+        del t[key]
+    assert t.best is None and list(t.by_frequency()) == []